@@ -3,9 +3,26 @@ Pythonic Mindset vs Java
 Goal: Understand the differences in programming paradigms between Python and Java.
     - Imperative style
     - Pythonic style (comprehensions, with, f-strings)
+    - Streaming style (generators, constant memory for huge files)
+    - Parallel style (byte-range shards across processes)
+    - Memory-mapped style (scan bytes, decode only what the filter touches)
+    - Cached style (columnar binary sidecar for repeated queries)
 """
 
 import csv
+import io
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import timeit
+import tracemalloc
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
 
 def java_style_parser(file_path: str, min_age: int):
     """Imperative style similar to Java"""
@@ -28,7 +45,473 @@ def pythonic_style_parser(file_path: str, min_age: int):
         results = [row for row in reader if int(row[2]) > min_age]
     return results
 
+def streaming_style_parser(file_path: str, min_age: int, column: str = "age",
+                           batch_size: int = 1000) -> Iterator[List[List[str]]]:
+    """Streaming style: yield matching rows in batches of at most batch_size.
+
+    The filter column is looked up by header name and only that field is
+    converted to int, so memory stays flat no matter how big the file is.
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be positive, got {batch_size}")
+    with open(file_path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        try:
+            index = header.index(column)
+        except ValueError:
+            raise ValueError(f"Column {column!r} not found in header {header}") from None
+        batch = []
+        for row in reader:
+            if int(row[index]) > min_age:
+                batch.append(row)
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+def streaming_rows(file_path: str, min_age: int, column: str = "age",
+                   batch_size: int = 1000) -> List[List[str]]:
+    """Collect every batch from streaming_style_parser into a single list."""
+    return [row for batch in streaming_style_parser(file_path, min_age, column, batch_size)
+            for row in batch]
+
+def _record_boundaries(file_path: str, targets: List[int],
+                       block_size: int = 1 << 20) -> List[int]:
+    """Return, for each target offset, the offset just past the first record end at or after it.
+
+    A newline ends a record only when the number of quote characters before it
+    is even; escaped quotes ("") count twice, so the parity rule still holds.
+    """
+    boundaries = []
+    pending = sorted(targets)
+    quotes = 0
+    offset = 0
+    with open(file_path, 'rb') as f:
+        while pending:
+            block = f.read(block_size)
+            if not block:
+                break
+            while pending and pending[0] < offset + len(block):
+                pos = block.find(b'\n', max(pending[0] - offset, 0))
+                while pos != -1 and (quotes + block.count(b'"', 0, pos)) % 2:
+                    pos = block.find(b'\n', pos + 1)
+                if pos == -1:
+                    break
+                boundaries.append(offset + pos + 1)
+                pending.pop(0)
+            quotes += block.count(b'"')
+            offset += len(block)
+    size = os.path.getsize(file_path)
+    return boundaries + [size] * len(pending)
+
+def _filter_range(file_path: str, start: int, end: int, index: int,
+                  min_age: int) -> List[List[str]]:
+    """Worker: filter the complete records stored in bytes [start, end)."""
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    reader = csv.reader(io.StringIO(text, newline=''))
+    return [row for row in reader if int(row[index]) > min_age]
+
+def parallel_style_parser(file_path: str, min_age: int, column: str = "age",
+                          workers: Optional[int] = None,
+                          chunk_size: int = 64 << 20) -> List[List[str]]:
+    """Parallel style: filter newline-aligned byte ranges in worker processes.
+
+    Shards are cut on record boundaries (quoted newlines never split a row)
+    and results are merged in file order, so the output matches the serial
+    parsers exactly.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    with open(file_path, 'r', newline='') as f:
+        header = next(csv.reader(f))
+    try:
+        index = header.index(column)
+    except ValueError:
+        raise ValueError(f"Column {column!r} not found in header {header}") from None
+
+    size = os.path.getsize(file_path)
+    header_end = _record_boundaries(file_path, [0])[0]
+    targets = list(range(header_end + chunk_size, size, chunk_size))
+    edges = [header_end] + _record_boundaries(file_path, targets) + [size]
+    ranges: List[Tuple[int, int]] = [(a, b) for a, b in zip(edges, edges[1:]) if a < b]
+    if not ranges:
+        return []
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        shards = executor.map(
+            _filter_range,
+            [file_path] * len(ranges),
+            [a for a, _ in ranges],
+            [b for _, b in ranges],
+            [index] * len(ranges),
+            [min_age] * len(ranges),
+        )
+        return [row for shard in shards for row in shard]
+
+def mmap_style_parser(file_path: str, min_age: int, column: str = "age",
+                      block_size: int = 1 << 20) -> List[List[str]]:
+    """Memory-mapped style: split records on the mapped bytes.
+
+    The file is walked in newline-aligned blocks. Only the filter field is
+    converted (int() accepts bytes directly) and a row is decoded into strings
+    only once it has passed the filter. Blocks that contain quotes fall back to
+    the csv module so quoted commas and newlines still work.
+    """
+    if os.path.getsize(file_path) == 0:
+        raise ValueError(f"{file_path} is empty")
+    results = []
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        pos = _record_boundaries(file_path, [0])[0]
+        header = next(csv.reader(io.StringIO(mm[:pos].decode('utf-8'), newline='')))
+        try:
+            index = header.index(column)
+        except ValueError:
+            raise ValueError(f"Column {column!r} not found in header {header}") from None
+
+        while pos < size:
+            end = mm.find(b'\n', min(pos + block_size, size - 1))
+            end = size if end == -1 else end + 1
+            if mm.find(b'"', pos, end) == -1:
+                for line in mm[pos:end].split(b'\n'):
+                    if line and int(line.split(b',', index + 1)[index]) > min_age:
+                        results.append(line.decode('utf-8').rstrip('\r').split(','))
+            else:
+                # Slow path: extend to the real end of the last record, then let csv parse it.
+                while mm[pos:end].count(b'"') % 2 and end < size:
+                    nxt = mm.find(b'\n', end)
+                    end = size if nxt == -1 else nxt + 1
+                reader = csv.reader(io.StringIO(mm[pos:end].decode('utf-8'), newline=''))
+                results.extend(row for row in reader if int(row[index]) > min_age)
+            pos = end
+    return results
+
+CACHE_MAGIC = b'CSVCOL1\n'
+
+class StringColumn:
+    """Column of strings stored as one UTF-8 blob plus an offset table.
+
+    ints holds the parsed values of a column whose strings are all integers
+    but not all in canonical form (e.g. zero-padded "040"), so it can be
+    filtered numerically while rows still come back exactly as written.
+    """
+
+    def __init__(self, blob: bytes, offsets: array, ints: Optional[array] = None):
+        self.blob = blob
+        self.offsets = offsets
+        self.ints = ints
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+
+Column = Union[array, StringColumn]
+
+def _cache_path(file_path: str) -> str:
+    return file_path + '.colcache'
+
+class _ColumnSpool:
+    """Streams one column to temp files while build_columnar_cache reads the CSV.
+
+    Values go to an array('q') file while the column still parses as
+    integers, and to an offset file plus a UTF-8 blob file once one of them
+    is not canonical. Until then the strings are not written at all: a
+    canonical int's string is str(int), so they are backfilled from the int
+    file on the first non-canonical value. Only _FLUSH rows are buffered.
+    """
+
+    _FLUSH = 1 << 16
+
+    def __init__(self, directory: str, index: int):
+        self._path = os.path.join(directory, str(index))
+        self.rows = 0
+        self.numeric = True
+        self.canonical = True
+        self._ints = array('q')
+        self._ints_file = open(self._path + '.ints', 'w+b')
+        self._offsets = array('Q')
+        self._blob = bytearray()
+        self._total = 0
+        self._offsets_file = self._blob_file = None
+
+    def append(self, value: str) -> None:
+        if self.numeric:
+            try:
+                number = int(value)
+                self._ints.append(number)
+            except (ValueError, OverflowError):
+                if self.canonical:
+                    self._start_strings()
+                self.numeric = False
+                self._ints_file.close()
+                self._ints = None
+            else:
+                if self.canonical and str(number) != value:
+                    self._ints.pop()
+                    self._start_strings()
+                    self._ints.append(number)
+        if not self.canonical:
+            encoded = value.encode('utf-8')
+            self._blob += encoded
+            self._total += len(encoded)
+            self._offsets.append(self._total)
+        self.rows += 1
+        if self.rows % self._FLUSH == 0:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self.numeric:
+            self._ints_file.write(self._ints.tobytes())
+            del self._ints[:]
+        if not self.canonical:
+            self._offsets_file.write(self._offsets.tobytes())
+            self._blob_file.write(self._blob)
+            del self._offsets[:]
+            del self._blob[:]
+
+    def _start_strings(self) -> None:
+        """Switch to writing strings, backfilling the rows seen so far from their ints."""
+        self.canonical = False
+        self._offsets_file = open(self._path + '.offsets', 'w+b')
+        self._blob_file = open(self._path + '.blob', 'w+b')
+        self._offsets.append(0)
+        pending = self._ints
+        self._ints_file.flush()
+        self._ints_file.seek(0)
+        while True:
+            chunk = array('q')
+            chunk.frombytes(self._ints_file.read(self._FLUSH * chunk.itemsize))
+            if not chunk:
+                break
+            self._backfill(chunk)
+        self._backfill(pending)
+
+    def _backfill(self, ints: array) -> None:
+        for number in ints:
+            encoded = str(number).encode('ascii')
+            self._blob += encoded
+            self._total += len(encoded)
+            self._offsets.append(self._total)
+        self._offsets_file.write(self._offsets.tobytes())
+        self._blob_file.write(self._blob)
+        del self._offsets[:]
+        del self._blob[:]
+
+    def finish(self) -> Tuple[str, List[io.BufferedRandom]]:
+        """Flush the buffers and return the column kind and its parts, rewound, in file order."""
+        self._flush()
+        if self.canonical:
+            kind, parts = 'int', [self._ints_file]
+        else:
+            parts = [self._offsets_file, self._blob_file]
+            kind = 'str'
+            if self.numeric:
+                kind, parts = 'intstr', [self._ints_file] + parts
+        for part in parts:
+            part.seek(0)
+        return kind, parts
+
+    def close(self) -> None:
+        for part in (self._ints_file, self._offsets_file, self._blob_file):
+            if part is not None:
+                part.close()
+
+def build_columnar_cache(file_path: str, cache_path: Optional[str] = None) -> str:
+    """Convert a CSV into the columnar sidecar format and return its path.
+
+    Layout: magic, 4-byte meta length, JSON meta, then each column in order.
+    Integer columns are raw array('q') bytes; string columns are an
+    array('Q') offset table (rows + 1 entries) followed by the UTF-8 blob.
+    A column is stored as int only if str(int(v)) == v for every value, so
+    rows read back from the cache are identical to the csv module's output.
+    Columns that parse as integers but are not all canonical ("040", " 7")
+    are stored as 'intstr': the array('q') values followed by the string
+    layout.
+
+    The CSV is read once and each column is spooled to its own temp files
+    next to the sidecar (see _ColumnSpool), so memory stays flat however big
+    the file is; the temp files are then concatenated behind the header.
+    """
+    cache_path = cache_path or _cache_path(file_path)
+    stat = os.stat(file_path)
+    directory = os.path.dirname(os.path.abspath(cache_path))
+    with tempfile.TemporaryDirectory(dir=directory) as spool_dir, \
+            open(file_path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        spools = [_ColumnSpool(spool_dir, i) for i in range(len(header))]
+        try:
+            appends = [spool.append for spool in spools]
+            for row in reader:
+                for append, value in zip(appends, row):
+                    append(value)
+
+            meta_columns = []
+            column_parts = []
+            for name, spool in zip(header, spools):
+                kind, parts = spool.finish()
+                nbytes = sum(os.fstat(part.fileno()).st_size for part in parts)
+                meta_columns.append({'name': name, 'kind': kind, 'nbytes': nbytes})
+                column_parts.extend(parts)
+            meta = json.dumps({
+                'mtime_ns': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'rows': spools[0].rows if spools else 0,
+                'columns': meta_columns,
+            }).encode('utf-8')
+            tmp_path = cache_path + '.tmp'
+            with open(tmp_path, 'wb') as out:
+                out.write(CACHE_MAGIC)
+                out.write(struct.pack('<I', len(meta)))
+                out.write(meta)
+                for part in column_parts:
+                    shutil.copyfileobj(part, out)
+        finally:
+            for spool in spools:
+                spool.close()
+    os.replace(tmp_path, cache_path)
+    return cache_path
+
+def _read_columnar_cache(file_path: str, cache_path: str) -> Optional[Dict[str, Column]]:
+    """Load the sidecar, or return None if it is missing, corrupt or stale.
+
+    The sidecar is memory-mapped rather than read, so each column is copied
+    once, straight out of the mapping, instead of via a whole-file buffer.
+    """
+    try:
+        with open(cache_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _decode_columnar_cache(file_path, mm)
+    except FileNotFoundError:
+        return None
+    except (ValueError, KeyError, TypeError, struct.error):
+        # ValueError covers an empty file, JSONDecodeError and UnicodeDecodeError.
+        return None
+
+def _decode_columnar_cache(file_path: str, mm: mmap.mmap) -> Optional[Dict[str, Column]]:
+    if mm[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+        return None
+    pos = len(CACHE_MAGIC)
+    (meta_len,) = struct.unpack_from('<I', mm, pos)
+    pos += 4
+    meta = json.loads(mm[pos:pos + meta_len])
+    pos += meta_len
+    stat = os.stat(file_path)
+    if meta['mtime_ns'] != stat.st_mtime_ns or meta['size'] != stat.st_size:
+        return None
+    rows = meta['rows']
+    if pos + sum(col['nbytes'] for col in meta['columns']) != len(mm):
+        raise ValueError("truncated or padded sidecar")
+
+    columns: Dict[str, Column] = {}
+    for col in meta['columns']:
+        end = pos + col['nbytes']
+        ints = None
+        if col['kind'] in ('int', 'intstr'):
+            ints = array('q')
+            ints.frombytes(mm[pos:pos + rows * ints.itemsize])
+            pos += rows * ints.itemsize
+        if col['kind'] == 'int':
+            columns[col['name']] = ints
+        elif col['kind'] in ('str', 'intstr'):
+            offsets = array('Q')
+            offsets.frombytes(mm[pos:pos + (rows + 1) * offsets.itemsize])
+            pos += (rows + 1) * offsets.itemsize
+            if len(offsets) != rows + 1 or pos + offsets[-1] != end:
+                raise ValueError(f"bad offset table for column {col['name']!r}")
+            columns[col['name']] = StringColumn(mm[pos:end], offsets, ints)
+        else:
+            raise ValueError(f"unknown column kind {col['kind']!r}")
+        if pos > end or (ints is not None and len(ints) != rows):
+            raise ValueError(f"column {col['name']!r} overruns its payload")
+        pos = end
+    return columns
+
+def load_columnar_cache(file_path: str, cache_path: Optional[str] = None) -> Dict[str, Column]:
+    """Return the cached columns, rebuilding the sidecar if mtime or size changed."""
+    cache_path = cache_path or _cache_path(file_path)
+    columns = _read_columnar_cache(file_path, cache_path)
+    if columns is None:
+        build_columnar_cache(file_path, cache_path)
+        columns = _read_columnar_cache(file_path, cache_path)
+    return columns
+
+def cached_style_parser(file_path: str, min_age: int, column: str = "age",
+                        cache_path: Optional[str] = None) -> List[List[str]]:
+    """Cached style: filter on the typed column from the columnar sidecar.
+
+    The first call pays for one full parse; later calls with any min_age only
+    compare integers and materialise the matching rows.
+    """
+    columns = load_columnar_cache(file_path, cache_path)
+    if column not in columns:
+        raise ValueError(f"Column {column!r} not found in header {list(columns)}")
+    ages = columns[column]
+    if isinstance(ages, StringColumn):
+        ages = ages.ints
+    if ages is None:
+        raise ValueError(f"Column {column!r} is not an integer column")
+    matches = [i for i, age in enumerate(ages) if age > min_age]
+    ordered = list(columns.values())
+    return [[str(col[i]) for col in ordered] for i in matches]
+
+def generate_csv(file_path: str, rows: int) -> None:
+    """Write a synthetic users CSV with the same layout as sample.csv."""
+    with open(file_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "age"])
+        writer.writerows((i, f"user{i}", 18 + i % 60) for i in range(1, rows + 1))
+
+def _measure(func: Callable[[], object]) -> tuple:
+    """Return (seconds, peak traced bytes) for func.
+
+    Timing and tracing use separate calls because tracemalloc slows allocations.
+    """
+    seconds = timeit.timeit(func, number=1)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+def benchmark_parsers(rows: int = 200_000, min_age: int = 30) -> None:
+    """Benchmark time and peak memory of the three parser styles."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "users.csv")
+        generate_csv(path, rows)
+        build_columnar_cache(path)
+
+        def consume_stream():
+            for _ in streaming_style_parser(path, min_age):
+                pass
+
+        print(f"=== CSV parser benchmark ({rows} rows, age > {min_age}) ===")
+        for label, func in [
+            ("java_style_parser", lambda: java_style_parser(path, min_age)),
+            ("pythonic_style_parser", lambda: pythonic_style_parser(path, min_age)),
+            ("streaming_style_parser", consume_stream),
+            ("mmap_style_parser", lambda: mmap_style_parser(path, min_age)),
+            ("cached_style_parser (warm)",
+             lambda: cached_style_parser(path, min_age)),
+            ("parallel_style_parser",
+             lambda: parallel_style_parser(path, min_age, chunk_size=1 << 20)),
+        ]:
+            seconds, peak = _measure(func)
+            print(f"{label:<28} {seconds:.3f}s  peak {peak / 1024:.0f} KiB")
+
 if __name__ == "__main__":
     file_path = 'session1/sample.csv'
     print("Imperative Style Results:", java_style_parser(file_path, 30))
     print("Pythonic Style Results:", pythonic_style_parser(file_path, 30))
+    print("Streaming Style Results:", streaming_rows(file_path, 30, batch_size=2))
+    print("Mmap Style Results:", mmap_style_parser(file_path, 30))
+    print("Cached Style Results:", cached_style_parser(
+        file_path, 30, cache_path=os.path.join(tempfile.gettempdir(), 'sample.csv.colcache')))
+    print("Parallel Style Results:", parallel_style_parser(file_path, 30, chunk_size=16))
+    benchmark_parsers()
+    benchmark_parsers(min_age=76)  # keeps under 2% of rows
@@ -0,0 +1,20 @@
+"""
+Test configuration and fixtures.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def write_csv(tmp_path):
+    """Write text to a CSV file under tmp_path and return its path."""
+    def write(text: str, name: str = "data.csv") -> str:
+        path = tmp_path / name
+        path.write_bytes(text.encode("utf-8"))
+        return str(path)
+
+    return write
@@ -0,0 +1,161 @@
+"""
+Unit tests for the CSV parsers.
+"""
+import csv
+import io
+import os
+import random
+import tracemalloc
+from array import array
+
+import pytest
+
+import csv_parser
+from csv_parser import (_record_boundaries, build_columnar_cache, cached_style_parser,
+                        load_columnar_cache, mmap_style_parser, parallel_style_parser)
+
+
+def csv_rows(path, min_age, column=2):
+    """Reference result: the csv module, filtering on int(row[column])."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader)
+        return [row for row in reader if int(row[column]) > min_age]
+
+
+def tricky_csv(rows: int = 400, seed: int = 3, line_end: str = "\n") -> str:
+    """CSV whose quoted fields hold commas, newlines, CRLFs and escaped quotes."""
+    rng = random.Random(seed)
+    pieces = ["plain", "a,b", "line\nbreak", 'say ""hi""', "\n", "crlf\r\ninside", ",\n,", '""']
+    out = io.StringIO()
+    out.write(f"id,name,age,note{line_end}")
+    for i in range(rows):
+        name = rng.choice(pieces)
+        note = "".join(rng.choice(pieces) for _ in range(rng.randrange(3)))
+        out.write(f'{i},"{name}",{rng.randrange(18, 80)},"{note}"{line_end}')
+    return out.getvalue()
+
+
+def record_ends(data: bytes):
+    """Offsets just past every record-ending newline (even quote count before it)."""
+    ends, quotes = [], 0
+    for pos, byte in enumerate(data):
+        if byte == ord('"'):
+            quotes += 1
+        elif byte == ord("\n") and quotes % 2 == 0:
+            ends.append(pos + 1)
+    return ends
+
+
+class TestRecordBoundaries:
+    """Quote-parity sharding never cuts a record in two."""
+
+    @pytest.mark.parametrize("block_size", [7, 64, 1 << 20])
+    def test_every_target_maps_to_the_next_record_end(self, write_csv, block_size):
+        path = write_csv(tricky_csv(60))
+        with open(path, "rb") as f:
+            data = f.read()
+        ends = record_ends(data)
+        targets = list(range(len(data)))
+        expected = [next((end for end in ends if end > target), len(data)) for target in targets]
+        assert _record_boundaries(path, targets, block_size=block_size) == expected
+
+    @pytest.mark.parametrize("line_end", ["\n", "\r\n"])
+    @pytest.mark.parametrize("chunk_size", [1, 97, 997, 1 << 20])
+    def test_parallel_parser_matches_csv_module(self, write_csv, line_end, chunk_size):
+        path = write_csv(tricky_csv(line_end=line_end))
+        assert parallel_style_parser(path, 40, workers=2, chunk_size=chunk_size) == csv_rows(path, 40)
+
+
+class TestMmapParser:
+    """mmap_style_parser agrees with the csv module on both of its paths."""
+
+    @pytest.mark.parametrize("line_end", ["\n", "\r\n"])
+    @pytest.mark.parametrize("block_size", [1, 50, 997, 1 << 20])
+    def test_quoted_fields_match_csv_module(self, write_csv, line_end, block_size):
+        path = write_csv(tricky_csv(line_end=line_end))
+        assert mmap_style_parser(path, 40, block_size=block_size) == csv_rows(path, 40)
+
+    @pytest.mark.parametrize("block_size", [1, 64, 1 << 20])
+    def test_unquoted_fast_path_matches_csv_module(self, write_csv, block_size):
+        rng = random.Random(5)
+        lines = [f"{i},name{i},{rng.randrange(18, 80)}" for i in range(500)]
+        path = write_csv("id,name,age\r\n" + "\r\n".join(lines))  # no trailing newline
+        assert mmap_style_parser(path, 40, block_size=block_size) == csv_rows(path, 40)
+
+    def test_quotes_in_some_blocks_only(self, write_csv):
+        """Fast and slow blocks interleave without losing or splitting rows."""
+        text = tricky_csv(50) + "".join(f"{i},plain,{20 + i % 50},x\n" for i in range(500, 900))
+        path = write_csv(text + tricky_csv(50).split("\n", 1)[1])
+        assert mmap_style_parser(path, 40, block_size=128) == csv_rows(path, 40)
+
+
+class TestColumnarCache:
+    """The sidecar cache behind cached_style_parser."""
+
+    SAMPLE = 'id,name,age\n1,Ann,040\n2,Bo,25\n3,"Cé, x",031\n4,Di,7\n'
+
+    def test_zero_padded_ints_filter_numerically_and_round_trip(self, write_csv):
+        path = write_csv(self.SAMPLE)
+        assert cached_style_parser(path, 30) == csv_rows(path, 30)
+        assert cached_style_parser(path, 30) == [["1", "Ann", "040"], ["3", "Cé, x", "031"]]
+
+    def test_non_integer_column_is_rejected(self, write_csv):
+        path = write_csv(self.SAMPLE)
+        with pytest.raises(ValueError, match="not an integer column"):
+            cached_style_parser(path, 30, column="name")
+
+    @pytest.mark.parametrize("keep", [0, 5, 12, 20, -3])
+    def test_truncated_sidecar_is_rebuilt(self, write_csv, keep):
+        path = write_csv(self.SAMPLE)
+        cache_path = build_columnar_cache(path)
+        with open(cache_path, "rb") as f:
+            data = f.read()
+        with open(cache_path, "wb") as f:
+            f.write(data[:keep])
+        assert cached_style_parser(path, 30) == csv_rows(path, 30)
+        with open(cache_path, "rb") as f:
+            assert f.read() == data
+
+    def test_garbage_meta_is_rebuilt(self, write_csv):
+        path = write_csv(self.SAMPLE)
+        cache_path = build_columnar_cache(path)
+        with open(cache_path, "r+b") as f:
+            f.seek(12)
+            f.write(b"{not json")
+        assert list(load_columnar_cache(path)) == ["id", "name", "age"]
+
+    def test_stale_sidecar_is_rebuilt(self, write_csv):
+        path = write_csv(self.SAMPLE)
+        cached_style_parser(path, 30)
+        write_csv(self.SAMPLE + "5,Ed,99\n")
+        assert cached_style_parser(path, 30) == csv_rows(path, 30)
+
+    def test_columns_change_kind_after_spilling(self, write_csv, monkeypatch):
+        """Rows already flushed to disk are backfilled when a column stops being canonical ints."""
+        monkeypatch.setattr(csv_parser._ColumnSpool, "_FLUSH", 4)
+        rows = [[str(i),
+                 f"{i:03d}" if i >= 9 else str(i),
+                 f"x{i}" if i == 13 else str(i),
+                 "x" if i == 12 else f"{i:03d}" if i >= 6 else str(i)]
+                for i in range(1, 20)]
+        path = write_csv("plain,padded,text,padded_text\n" + "".join(",".join(row) + "\n" for row in rows))
+        columns = load_columnar_cache(path)
+        assert isinstance(columns["plain"], array)
+        assert list(columns["padded"].ints) == list(range(1, 20))
+        assert columns["text"].ints is None and columns["padded_text"].ints is None
+        assert [[str(col[i]) for col in columns.values()] for i in range(19)] == rows
+
+    def test_build_memory_does_not_grow_with_the_file(self, write_csv, monkeypatch):
+        monkeypatch.setattr(csv_parser._ColumnSpool, "_FLUSH", 1024)
+        rng = random.Random(3)
+        path = write_csv("id,name,age\n" + "".join(f"{i},name{rng.randrange(10**6)},{rng.randrange(90)}\n"
+                                                  for i in range(200_000)))
+        tracemalloc.start()
+        try:
+            build_columnar_cache(path)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert peak < os.path.getsize(path) // 10
+        assert cached_style_parser(path, 60) == csv_rows(path, 60)
@@ -0,0 +1,26 @@
+"""
+Test configuration and fixtures.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from user_service import CompactUserStore, DictUserStore
+
+
+@pytest.fixture(params=[DictUserStore, CompactUserStore], ids=["dict", "compact"])
+def store_cls(request):
+    """Each store implementation in turn."""
+    return request.param
+
+
+@pytest.fixture
+def fast_switching():
+    """Make the GIL switch threads as often as possible, to shake out races."""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
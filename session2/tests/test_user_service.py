@@ -0,0 +1,275 @@
+"""
+Unit tests for the user service and its stores.
+"""
+import heapq
+import random
+import threading
+
+import pytest
+
+import user_service
+from user_service import (CompactUserStore, ConcurrentUserService, NameIndex,
+                          PersistentUserService, UserService, save_snapshot)
+
+
+class TestConcurrentUserService:
+    """Races between threads sharing one ConcurrentUserService."""
+
+    def test_concurrent_adds_keep_emails_unique(self, store_cls, fast_switching):
+        """Threads re-adding the same emails across table rehashes never duplicate one."""
+        service = ConcurrentUserService(store_cls())
+        emails = [f"user{i}@example.com" for i in range(20_000)]
+
+        def add_all():
+            for email in emails:
+                try:
+                    service.add("user", email)
+                except ValueError:
+                    pass
+
+        threads = [threading.Thread(target=add_all) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        users = service.list()
+        assert sorted(u.email for u in users) == sorted(emails)
+        assert all(service._store.id_for_email(u.email) == u.id for u in users)
+
+    def test_lock_free_reads_during_adds_and_deletes(self, store_cls, fast_switching):
+        """Readers never crash or see a half-written or half-removed user."""
+        service = ConcurrentUserService(store_cls())
+        done = threading.Event()
+        errors = []
+
+        def check(user):
+            if user is not None and (user.name != f"n{user.id % 10}" or user.email != f"u{user.id}@example.com"):
+                errors.append(user)
+
+        def read():
+            rng = random.Random()
+            try:
+                while not done.is_set():
+                    # Recent ids and small name buckets keep readers on the slots being written.
+                    newest = service._next_id
+                    for user_id in range(max(1, newest - 8), newest + 2):
+                        check(service.get(user_id))
+                    for user in service.searchByName(f"N{rng.randrange(10)}"):
+                        check(user)
+            except Exception as exc:  # surfaced below; a thread would swallow it
+                errors.append(exc)
+
+        readers = [threading.Thread(target=read) for _ in range(3)]
+        for thread in readers:
+            thread.start()
+        try:
+            for start in range(1, 30_000, 20):
+                batch = [(f"n{i % 10}", f"u{i}@example.com") for i in range(start, start + 20)]
+                if start % 40 == 1:
+                    service.add_many(batch)
+                else:
+                    for name, email in batch:
+                        service.add(name, email)
+                for user_id in range(start, start + 20):
+                    service.delete(user_id)
+        finally:
+            done.set()
+            for thread in readers:
+                thread.join()
+
+        assert errors == []
+        assert service.list() == []
+
+
+class TestPersistentUserService:
+    """Snapshot plus change log round trips, including after crashes."""
+
+    @staticmethod
+    def _open(directory, store_cls):
+        return PersistentUserService(str(directory), store_cls(), name_index=True)
+
+    @staticmethod
+    def _state(service):
+        users = sorted((u.id, u.name, u.email) for u in service.list())
+        return users, dict(service._names._counts), service._next_id
+
+    def _populate(self, directory, store_cls):
+        service = self._open(directory, store_cls)
+        service.add_many([("alice", "alice@example.com"), ("bob", "bob@example.com")])
+        service.checkpoint()
+        service.add("alice", "alice2@example.com")
+        service.add("carol", "carol@example.com")
+        service.delete(2)
+        return service
+
+    def test_round_trip(self, tmp_path, store_cls):
+        service = self._populate(tmp_path, store_cls)
+        expected = self._state(service)
+        service.close()
+        restarted = self._open(tmp_path, store_cls)
+        assert self._state(restarted) == expected
+        restarted.checkpoint()
+        restarted.close()
+        assert self._state(self._open(tmp_path, store_cls)) == expected
+
+    def test_torn_record_is_dropped(self, tmp_path, store_cls):
+        service = self._populate(tmp_path, store_cls)
+        expected = self._state(service)
+        service.add("dave", "dave@example.com")
+        service.close()
+        log_path = tmp_path / "users.log"
+        log_path.write_bytes(log_path.read_bytes()[:-5])
+
+        restarted = self._open(tmp_path, store_cls)
+        assert self._state(restarted) == expected
+        restarted.add("erin", "erin@example.com")  # appends after the truncated tail
+        restarted.close()
+        users = self._open(tmp_path, store_cls).list()
+        assert "erin@example.com" in {u.email for u in users}
+
+    def test_crash_between_snapshot_and_log_truncation(self, tmp_path, store_cls):
+        """A snapshot that already holds the logged changes must not replay them twice."""
+        service = self._populate(tmp_path, store_cls)
+        expected = self._state(service)
+        # First half of checkpoint(): the new snapshot lands, the old log stays.
+        save_snapshot(service, service.snapshot_path, service._generation + 1)
+        service.close()
+
+        restarted = self._open(tmp_path, store_cls)
+        assert self._state(restarted) == expected
+        restarted.delete(1)
+        restarted.close()
+        restarted = self._open(tmp_path, store_cls)
+        assert [u.id for u in restarted.list()] == [3, 4]
+        assert restarted.searchByName("alice")[0].id == 3
+
+    def test_oversized_fields_leave_memory_and_log_untouched(self, tmp_path, monkeypatch, store_cls):
+        service = self._populate(tmp_path, store_cls)
+        expected = self._state(service)
+        monkeypatch.setattr(user_service, "_MAX_FIELD", 16)
+        with pytest.raises(ValueError):
+            service.add("x" * 17, "long@example.com")
+        with pytest.raises(ValueError):
+            service.add_many([("ok", "ok@example.com"), ("y", "y" * 17)])
+        assert self._state(service) == expected
+        service.close()
+        assert self._state(self._open(tmp_path, store_cls)) == expected
+
+
+class TestCompactUserStore:
+    """Index bookkeeping inside CompactUserStore."""
+
+    @staticmethod
+    def _live_email_cells(store):
+        return sum(1 for slot in store._email_table if slot >= 0)
+
+    def test_each_email_is_indexed_once_across_rehashes(self):
+        store = CompactUserStore()
+        for i in range(1000):
+            store.insert(i + 1, "user", f"user{i}@example.com")
+        store.insert_many(1001, [("user", f"bulk{i}@example.com") for i in range(1000)])
+        assert self._live_email_cells(store) == len(store) == 2000
+        assert store.id_for_email("user999@example.com") == 1000
+        assert store.id_for_email("bulk999@example.com") == 2000
+
+    def test_name_buckets_stay_bounded_under_churn(self):
+        store = CompactUserStore()
+        next_id = 1
+        for _ in range(50):
+            ids = list(range(next_id, next_id + 100))
+            store.insert_many(next_id, [("Ann", f"ann{i}@example.com") for i in ids])
+            next_id += 100
+            for user_id in ids[:-1]:
+                store.remove(user_id)
+        assert len(store.find_by_name("ann")) == 50
+        assert len(store._name_slots["ann"]) < 200
+
+
+class TestUserService:
+    """The name index is opt-in."""
+
+    def test_name_search_needs_the_index(self, store_cls):
+        service = UserService(store_cls())
+        service.add_many([("Ann", "ann@example.com"), ("Bob", "bob@example.com")])
+        service.delete(2)
+        assert [u.name for u in service.searchByName("ann")] == ["Ann"]
+        for search in (service.searchByPrefix, service.searchContaining, service.searchFuzzy):
+            with pytest.raises(RuntimeError):
+                search("an")
+
+    def test_name_search_with_the_index(self, store_cls):
+        service = ConcurrentUserService(store_cls(), name_index=True)
+        service.add_many([("Ann", "ann@example.com"), ("Anna", "anna@example.com"), ("Bob", "bob@example.com")])
+        service.delete(2)
+        assert [u.name for u in service.searchByPrefix("an")] == ["Ann"]
+        assert [u.name for u in service.searchContaining("o")] == ["Bob"]
+        assert [u.name for u in service.searchFuzzy("Anx")] == ["Ann"]
+
+
+@pytest.fixture(scope="module")
+def name_index():
+    """5k random names, shared by the read-only NameIndex tests."""
+    rng = random.Random(7)
+    index = NameIndex()
+    index.add_many(user_service._random_name(rng) for _ in range(5_000))
+    return index
+
+
+class TestNameIndex:
+    """Substring and fuzzy search agree with a brute-force scan."""
+
+    @pytest.mark.parametrize("query", ["a", "q", "Ka", "ky", "zz", "", "kod", "xq", "a k", "Bak", "koda", "a Kod"])
+    @pytest.mark.parametrize("limit", [20, None])
+    def test_containing_matches_scan(self, name_index, query, limit):
+        expected = sorted(key for key in name_index._counts if query.casefold() in key)
+        assert name_index.containing(query, limit) == expected[:limit]
+
+    @staticmethod
+    def _scan_fuzzy(index, query, limit):
+        grams = user_service._trigrams(query.casefold())
+        scored = []
+        for key in index._counts:
+            shared = len(grams & user_service._trigrams(key))
+            score = shared / (len(grams) + len(user_service._trigrams(key)) - shared)
+            if score >= 0.3:
+                scored.append((score, key))
+        return heapq.nlargest(limit, scored)
+
+    @pytest.mark.parametrize("query", ["Baka Kodoxy", "ki", "Bak", "tosu"])
+    def test_fuzzy_matches_scan_when_the_window_covers_the_index(self, name_index, query):
+        assert name_index.fuzzy(query, limit=10, window=len(name_index)) == self._scan_fuzzy(name_index, query, 10)
+
+    def test_bounded_fuzzy_finds_typos_anywhere(self, name_index):
+        """A typo near either end, or a missing tail, still ranks the name first."""
+        rng = random.Random(3)
+        names = rng.sample(sorted(name_index._counts), 30)
+        for name in names:
+            at = rng.randrange(len(name))
+            for query in (name[:at] + "#" + name[at + 1:], name[:-3]):
+                found = name_index.fuzzy(query, limit=5)
+                best = self._scan_fuzzy(name_index, query, 1)
+                assert found[0][0] == best[0][0], query
+                assert name in {key for _, key in found}, query
+
+    def test_batches_merge_like_one_bulk_load(self, name_index):
+        names = sorted(name_index._counts)
+        index = NameIndex()
+        index.add_many(names[::3])  # fresh lists
+        index.add_many(names[1::3])  # merged into large lists
+        for name in names[2::3]:
+            index.add(name)  # inserted one at a time
+        assert list(index._sorted) == names
+        assert list(index._reversed) == sorted(name[::-1] for name in names)
+        assert {gram: list(keys) for gram, keys in index._postings.items()} == {
+            gram: list(keys) for gram, keys in name_index._postings.items()}
+
+    def test_short_queries_after_removal(self):
+        index = NameIndex()
+        index.add_many(["Ann", "Bob", "Anna"])
+        index.remove("Ann")
+        assert index.containing("an") == ["anna"]
+        assert index.containing("o") == ["bob"]
+        index.remove("Bob")
+        assert index.containing("o") == []
+        assert "o" not in index._grams_with
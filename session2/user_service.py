@@ -1,8 +1,26 @@
+import asyncio
+import bisect
+import gc
+import heapq
+import itertools
+import mmap
+import os
+import random
+import struct
+import tempfile
+import threading
+import time
+import tracemalloc
+from array import array
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 @dataclass
 class User:
+    __slots__ = ("id", "name", "email")
+
     id: int
     name: str
     email: str
@@ -13,41 +31,1172 @@ class User:
     def __repr__(self):
         return f"User(id={self.id}, name='{self.name}', email='{self.email}')"
 
-class UserService:
+class DictUserStore:
+    """Default storage: one User object per user plus dict indexes.
+
+    Indexes:
+        _users:    id -> User (dict keeps insertion order)
+        _by_email: email -> id
+        _by_name:  case-folded name -> {id: None} (an insertion-ordered set)
+    """
+
+    def __init__(self):
+        self._users: Dict[int, User] = {}
+        self._by_email: Dict[str, int] = {}
+        self._by_name: Dict[str, Dict[int, None]] = {}
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def __iter__(self) -> Iterator[User]:
+        return iter(list(self._users.values()))
+
+    def insert(self, user_id: int, name: str, email: str) -> User:
+        user = User(id=user_id, name=name, email=email)
+        self._users[user_id] = user
+        self._by_email[email] = user_id
+        self._by_name.setdefault(name.casefold(), {})[user_id] = None
+        return user
+
+    def insert_many(self, first_id: int, batch: List[Tuple[str, str]]) -> List[User]:
+        users = [User(user_id, name, email) for user_id, (name, email) in enumerate(batch, first_id)]
+        self._users.update((user.id, user) for user in users)
+        self._by_email.update((user.email, user.id) for user in users)
+        by_name = self._by_name
+        for user in users:
+            key = user.name.casefold()
+            ids = by_name.get(key)
+            if ids is None:
+                ids = by_name[key] = {}
+            ids[user.id] = None
+        return users
+
+    def get(self, user_id: int) -> Optional[User]:
+        return self._users.get(user_id)
+
+    def id_for_email(self, email: str) -> Optional[int]:
+        return self._by_email.get(email)
+
+    def find_by_name(self, name: str) -> List[User]:
+        # Snapshot the ids (one C call) so a concurrent writer cannot resize
+        # the dict mid-iteration; ids deleted since then are skipped.
+        ids = list(self._by_name.get(name.casefold(), ()))
+        users = self._users
+        return [user for user in map(users.get, ids) if user is not None]
+
+    def remove(self, user_id: int) -> Optional[User]:
+        user = self._users.pop(user_id, None)
+        if user is None:
+            return None
+        del self._by_email[user.email]
+        key = user.name.casefold()
+        ids = self._by_name[key]
+        del ids[user_id]
+        if not ids:
+            del self._by_name[key]
+        return user
+
+_EMPTY = -1
+_DELETED = -2
+
+class CompactUserStore:
+    """Array-backed storage for millions of users.
+
+    Ids are handed out sequentially, so user ``id`` lives in slot ``id - 1`` of
+    parallel arrays and is never stored. Names are interned in a string table
+    (most names repeat) and each slot keeps only a 4-byte name index. Emails
+    are indexed by an open-addressing table of 4-byte slots keyed on
+    ``hash(email)`` instead of a dict, which would cost an int object and a
+    dict entry per user. Deleted slots are tombstoned in ``_alive`` instead of
+    shifting the arrays; the name buckets skip them lazily and are compacted
+    once most of a bucket is dead. ``get`` builds a fresh ``User`` view on each
+    call, so mutating a returned user does not change the stored record.
+
+    Lock-free readers are safe against one writer: a slot's fields are written
+    before ``_alive`` marks it live, and only then is it published to the
+    email table and name buckets. Readers copy the fields and then re-check
+    ``_alive``, so a user removed mid-read is reported as missing, never
+    half-cleared.
+    """
+
     def __init__(self):
-        self._users: List[User] = []
+        self._names: List[str] = []
+        self._name_lookup: Dict[str, int] = {}
+        self._name_slots: Dict[str, array] = {}
+        self._name_dead: Dict[str, int] = {}
+        self._name_of = array('I')
+        self._emails: List[Optional[str]] = []
+        self._email_table = array('i', [_EMPTY]) * 8
+        self._email_used = 0
+        self._alive = bytearray()
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[User]:
+        for slot in range(len(self._alive)):
+            user = self._live_view(slot)
+            if user is not None:
+                yield user
+
+    def _email_position(self, email: str) -> int:
+        """Return the table position holding email, or -1 if absent."""
+        table = self._email_table
+        mask = len(table) - 1
+        pos = hash(email) & mask
+        while True:
+            slot = table[pos]
+            if slot == _EMPTY:
+                return -1
+            if slot != _DELETED and self._emails[slot] == email:
+                return pos
+            pos = (pos + 1) & mask
+
+    def _email_put(self, email: str, slot: int) -> None:
+        if (self._email_used + 1) * 2 > len(self._email_table):
+            self._email_rehash()
+        if self._table_put(self._email_table, email, slot):
+            self._email_used += 1
+
+    @staticmethod
+    def _table_put(table: array, email: str, slot: int) -> bool:
+        """Store slot at email's free position; True if it used an empty cell."""
+        mask = len(table) - 1
+        pos = hash(email) & mask
+        while table[pos] >= 0:
+            pos = (pos + 1) & mask
+        fresh = table[pos] == _EMPTY
+        table[pos] = slot
+        return fresh
+
+    def _email_rehash(self) -> None:
+        # Fill a new table off to the side and publish it with one assignment:
+        # lock-free readers (ConcurrentUserService's uniqueness check) must
+        # never see a partially filled table. Only slots already in the old
+        # table move over; the email being put (already in _emails) is added
+        # by the caller.
+        size = 8
+        while size < (self._count + 1) * 4:
+            size *= 2
+        table = array('i', [_EMPTY]) * size
+        used = 0
+        emails = self._emails
+        for slot in self._email_table:
+            if slot >= 0:
+                used += self._table_put(table, emails[slot], slot)
+        self._email_table = table
+        self._email_used = used
+
+    def _view(self, slot: int) -> User:
+        return User(id=slot + 1, name=self._names[self._name_of[slot]], email=self._emails[slot])
+
+    def _live_view(self, slot: int) -> Optional[User]:
+        """View of slot, or None if it is dead; safe against a concurrent remove."""
+        if not self._alive[slot]:
+            return None
+        name_index, email = self._name_of[slot], self._emails[slot]
+        # remove() clears _alive before _emails: if it ran since the check
+        # above, the copied email may be None, so check again.
+        if not self._alive[slot]:
+            return None
+        return User(id=slot + 1, name=self._names[name_index], email=email)
+
+    def _pad_to(self, slot: int) -> None:
+        """Turn ids skipped by the caller into dead slots."""
+        if slot < len(self._alive):
+            raise ValueError(f"CompactUserStore requires increasing ids, got {slot + 1}")
+        padding = slot - len(self._alive)
+        if padding:
+            self._name_of.extend([0] * padding)
+            self._emails.extend([None] * padding)
+            self._alive.extend(bytes(padding))
+
+    def insert(self, user_id: int, name: str, email: str) -> User:
+        slot = user_id - 1
+        self._pad_to(slot)
+        name_index = self._name_lookup.get(name)
+        if name_index is None:
+            name_index = len(self._names)
+            self._names.append(name)
+            self._name_lookup[name] = name_index
+        self._name_of.append(name_index)
+        self._emails.append(email)
+        self._alive.append(1)
+        self._count += 1
+        # Publish only once the slot is complete and live.
+        self._email_put(email, slot)
+        self._name_slots.setdefault(name.casefold(), array('I')).append(slot)
+        return self._view(slot)
+
+    def insert_many(self, first_id: int, batch: List[Tuple[str, str]]) -> List[User]:
+        self._pad_to(first_id - 1)
+        names, name_lookup, name_slots = self._names, self._name_lookup, self._name_slots
+        name_of = array('I')
+        for name, _ in batch:
+            name_index = name_lookup.get(name)
+            if name_index is None:
+                name_index = name_lookup[name] = len(names)
+                names.append(name)
+            name_of.append(name_index)
+        self._name_of.extend(name_of)
+        self._emails.extend(email for _, email in batch)
+        self._alive.extend(b'\x01' * len(batch))
+        self._count += len(batch)
+        # Publish only once every slot in the batch is complete and live.
+        for slot, (name, email) in enumerate(batch, first_id - 1):
+            self._email_put(email, slot)
+            bucket = name_slots.get(name.casefold())
+            if bucket is None:
+                bucket = name_slots[name.casefold()] = array('I')
+            bucket.append(slot)
+        return [User(slot + 1, names[name_of[i]], batch[i][1])
+                for i, slot in enumerate(range(first_id - 1, first_id - 1 + len(batch)))]
+
+    def get(self, user_id: int) -> Optional[User]:
+        slot = user_id - 1
+        if 0 <= slot < len(self._alive):
+            return self._live_view(slot)
+        return None
+
+    def id_for_email(self, email: str) -> Optional[int]:
+        pos = self._email_position(email)
+        return None if pos == -1 else self._email_table[pos] + 1
+
+    def find_by_name(self, name: str) -> List[User]:
+        slots = self._name_slots.get(name.casefold(), ())
+        users = map(self._live_view, slots)
+        return [user for user in users if user is not None]
+
+    def remove(self, user_id: int) -> Optional[User]:
+        user = self.get(user_id)
+        if user is None:
+            return None
+        slot = user_id - 1
+        self._email_table[self._email_position(user.email)] = _DELETED
+        self._alive[slot] = 0
+        self._emails[slot] = None
+        self._count -= 1
+        self._prune_name_slots(user.name.casefold())
+        return user
+
+    def _prune_name_slots(self, key: str) -> None:
+        """Count a dead slot in key's bucket; rebuild the bucket once most of it is dead."""
+        dead = self._name_dead.get(key, 0) + 1
+        bucket = self._name_slots[key]
+        if dead * 2 <= len(bucket):
+            self._name_dead[key] = dead
+            return
+        self._name_dead.pop(key, None)
+        alive = self._alive
+        live = array('I', (slot for slot in bucket if alive[slot]))
+        if live:
+            self._name_slots[key] = live  # one assignment: readers see old or new
+        else:
+            del self._name_slots[key]
+
+def _trigrams(text: str) -> Set[str]:
+    """Trigrams of text padded like pg_trgm, so word starts and ends count."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _quadgrams(text: str) -> Set[str]:
+    """4-grams of text, padded like _trigrams so even a one-letter name has one."""
+    padded = f"  {text} "
+    return {padded[i:i + 4] for i in range(len(padded) - 3)}
+
+class _SortedKeys:
+    """Sorted list of strings split into bounded chunks.
+
+    A flat list would make every insort/delete shift millions of pointers;
+    chunks of at most 2 * _LOAD keys keep each update to one small memmove.
+    """
+
+    __slots__ = ("_chunks", "_maxes", "_len")
+
+    _LOAD = 1000
+
+    def __init__(self):
+        self._chunks: List[List[str]] = []
+        self._maxes: List[str] = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, key: str) -> None:
+        self._len += 1
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+            return
+        i = min(bisect.bisect_left(self._maxes, key), len(self._chunks) - 1)
+        chunk = self._chunks[i]
+        bisect.insort(chunk, key)
+        self._maxes[i] = chunk[-1]
+        if len(chunk) > 2 * self._LOAD:
+            self._chunks[i:i + 1] = [chunk[:self._LOAD], chunk[self._LOAD:]]
+            self._maxes[i:i + 1] = [chunk[self._LOAD - 1], chunk[-1]]
+
+    def update(self, keys: List[str]) -> None:
+        """Add a batch of keys, rebuilding the chunks when it is large."""
+        if len(keys) * 8 < self._len:
+            for key in keys:
+                self.add(key)
+            return
+        merged = sorted(itertools.chain(self, keys))  # two sorted runs: a linear merge
+        self._chunks = [merged[i:i + self._LOAD] for i in range(0, len(merged), self._LOAD)]
+        self._maxes = [chunk[-1] for chunk in self._chunks]
+        self._len = len(merged)
+
+    def remove(self, key: str) -> None:
+        i = bisect.bisect_left(self._maxes, key)
+        chunk = self._chunks[i]
+        del chunk[bisect.bisect_left(chunk, key)]
+        self._len -= 1
+        if chunk:
+            self._maxes[i] = chunk[-1]
+        else:
+            del self._chunks[i]
+            del self._maxes[i]
+
+    def irange_from(self, start: str) -> Iterator[str]:
+        """Yield keys >= start in sorted order."""
+        i = bisect.bisect_left(self._maxes, start)
+        if i == len(self._chunks):
+            return
+        chunk = self._chunks[i]
+        yield from chunk[bisect.bisect_left(chunk, start):]
+        for chunk in self._chunks[i + 1:]:
+            yield from chunk
+
+    def around(self, key: str, count: int) -> List[str]:
+        """Return up to count keys on each side of where key sorts, in order."""
+        if not self._chunks:
+            return []
+        i = min(bisect.bisect_left(self._maxes, key), len(self._chunks) - 1)
+        chunk = self._chunks[i]
+        j = bisect.bisect_left(chunk, key)
+        before, after = chunk[max(0, j - count):j], chunk[j:j + count]
+        k = i
+        while len(before) < count and k > 0:
+            k -= 1
+            before = self._chunks[k][-(count - len(before)):] + before
+        k = i
+        while len(after) < count and k + 1 < len(self._chunks):
+            k += 1
+            after += self._chunks[k][:count - len(after)]
+        return before + after
+
+    def __iter__(self) -> Iterator[str]:
+        for chunk in self._chunks:
+            yield from chunk
+
+class NameIndex:
+    """Prefix, substring and fuzzy lookup over distinct case-folded names.
+
+    Only distinct names are indexed, with a refcount per name; the store's
+    name multimap turns a matching name back into users. Everything is kept
+    in chunked sorted lists, updated incrementally: all names, all names
+    reversed, and one posting list per 4-gram. A small map from each 1-3
+    character string to the 4-grams containing it serves queries too short
+    to have a 4-gram of their own.
+
+    Sorted postings cost ~8 bytes per entry (a set costs several times
+    that) and let a substring query stop after limit matches. Fuzzy queries
+    do not read postings at all; see fuzzy().
+    """
+
+    def __init__(self):
+        self._counts: Dict[str, int] = {}
+        self._sorted = _SortedKeys()
+        self._reversed = _SortedKeys()
+        self._postings: Dict[str, _SortedKeys] = {}
+        self._grams_with: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def add(self, name: str) -> None:
+        key = name.casefold()
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if not count:
+            self._sorted.add(key)
+            self._reversed.add(key[::-1])
+            for gram in _quadgrams(key):
+                self._posting(gram).add(key)
+
+    def add_many(self, names: Iterable[str]) -> None:
+        """Add a batch of names; each distinct name is indexed only once.
+
+        New names are merged into each sorted list in one step rather than
+        inserted one at a time, which keeps bulk loads linear.
+        """
+        new = []
+        for key, extra in Counter(map(str.casefold, names)).items():
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + extra
+            if not count:
+                new.append(key)
+        new.sort()
+        grams: Dict[str, List[str]] = {}
+        for key in new:
+            for gram in _quadgrams(key):
+                grams.setdefault(gram, []).append(key)  # stays sorted
+        self._sorted.update(new)
+        self._reversed.update(sorted(key[::-1] for key in new))
+        for gram, keys in grams.items():
+            self._posting(gram).update(keys)
+
+    def _posting(self, gram: str) -> _SortedKeys:
+        keys = self._postings.get(gram)
+        if keys is None:
+            keys = self._postings[gram] = _SortedKeys()
+            for part in self._short_parts(gram):
+                self._grams_with.setdefault(part, set()).add(gram)
+        return keys
+
+    @staticmethod
+    def _short_parts(gram: str) -> Set[str]:
+        return {gram[i:j] for i in range(4) for j in range(i + 1, min(i + 4, 5))}
+
+    def remove(self, name: str) -> None:
+        key = name.casefold()
+        count = self._counts[key] - 1
+        if count:
+            self._counts[key] = count
+            return
+        del self._counts[key]
+        self._sorted.remove(key)
+        self._reversed.remove(key[::-1])
+        for gram in _quadgrams(key):
+            keys = self._postings[gram]
+            keys.remove(key)
+            if not keys:
+                del self._postings[gram]
+                for part in self._short_parts(gram):
+                    grams = self._grams_with[part]
+                    grams.discard(gram)
+                    if not grams:
+                        del self._grams_with[part]
+
+    def prefix(self, prefix: str) -> Iterator[str]:
+        """Yield names starting with prefix, in sorted order."""
+        prefix = prefix.casefold()
+        for key in self._sorted.irange_from(prefix):
+            if not key.startswith(prefix):
+                break
+            yield key
+
+    def containing(self, text: str, limit: Optional[int] = None) -> List[str]:
+        """Return up to limit names containing text, in sorted order.
+
+        Candidates come from the posting of the rarest 4-gram of text and are
+        verified with ``in``. The posting is sorted, so the walk stops at the
+        limit-th match instead of reading the whole posting.
+
+        A 1-3 character query has no 4-gram of its own, but every name
+        containing it is in the postings of the 4-grams containing it; merging
+        those sorted postings yields the matches in order. A common query
+        (e.g. one letter) has thousands of such postings, so the sorted names
+        are first walked for about as long as the merge would take, which is
+        plenty to find limit matches when they are common.
+        """
+        text = text.casefold()
+        if not text:
+            return list(itertools.islice(self._sorted, limit))
+        if len(text) >= 4:
+            grams = (text[i:i + 4] for i in range(len(text) - 3))
+            rarest = min((self._postings.get(gram, ()) for gram in grams), key=len)
+            return list(itertools.islice((key for key in rarest if text in key), limit))
+        grams = self._grams_with.get(text, ())
+        if limit is not None:
+            walked = itertools.islice(self._sorted, 16 * len(grams))
+            matches = list(itertools.islice((key for key in walked if text in key), limit))
+            if len(matches) == limit:
+                return matches
+        postings = [self._postings[gram] for gram in grams]
+        if limit is None:
+            return sorted(set().union(*postings))
+        # A name containing text more than once is in several postings.
+        merged = (key for key, _ in itertools.groupby(heapq.merge(*postings)))
+        return list(itertools.islice(merged, limit))
+
+    def fuzzy(self, text: str, limit: int = 10, min_score: float = 0.3,
+              window: int = 50) -> List[Tuple[float, str]]:
+        """Return up to limit (score, name) pairs ranked by trigram (Jaccard) similarity.
+
+        Scoring every name, or even every name sharing a rare trigram with
+        the query, grows linearly with the index. Instead only the neighbours
+        of the query are scored: ``window`` names on each side of it in
+        sorted order, which are the names sharing the longest prefixes with
+        it, and likewise in the reversed names for the longest suffixes. A
+        typo or a missing tail leaves one end of the name intact, so that
+        name is among the neighbours. The cost is bounded by window, not by
+        the number of names: with benchmark_search's names a query takes
+        ~0.6 ms at 5M names.
+
+        The search is exact once window >= len(self); otherwise a name that
+        differs from the query near both ends can be missed.
+        """
+        key = text.casefold()
+        candidates = set(self._sorted.around(key, window))
+        candidates.update(name[::-1] for name in self._reversed.around(key[::-1], window))
+        query = _trigrams(key)
+        scored = []
+        for name in candidates:
+            grams = _trigrams(name)
+            shared = len(query & grams)
+            score = shared / (len(query) + len(grams) - shared)
+            if score >= min_score:
+                scored.append((score, name))
+        return heapq.nlargest(limit, scored)
+
+class UserService:
+    """In-memory user CRUD with O(1) lookups on a pluggable store.
+
+    Pass ``store=CompactUserStore()`` to keep millions of users in parallel
+    arrays instead of one object per user.
+
+    Exact name lookups (searchByName) come from the store. Prefix, substring
+    and fuzzy search need ``name_index=True``, which maintains a NameIndex
+    alongside the store. It is off by default because it roughly doubles
+    the memory per user (see benchmark_memory).
+    """
+
+    def __init__(self, store=None, name_index: bool = False):
+        self._store = store if store is not None else DictUserStore()
+        self._names: Optional[NameIndex] = NameIndex() if name_index else None
         self._next_id = 1
 
+    def _name_index(self) -> NameIndex:
+        if self._names is None:
+            raise RuntimeError("name search needs a service created with name_index=True")
+        return self._names
+
     def add(self, name: str, email: str) -> User:
-        if any(user.email == email for user in self._users):
+        if self._store.id_for_email(email) is not None:
             raise ValueError(f"Email {email} is already in use.")
-        user = User(id=self._next_id, name=name, email=email)
-        self._users.append(user)
+        user = self._store.insert(self._next_id, name, email)
+        if self._names is not None:
+            self._names.add(name)
         self._next_id += 1
         return user
 
+    def add_many(self, users: Iterable[Tuple[str, str]]) -> List[User]:
+        """Add (name, email) pairs as one batch.
+
+        Emails are checked against the store and against each other before
+        anything is written, so a duplicate rejects the whole batch. Ids are
+        assigned as one contiguous block. The cyclic GC is paused while the
+        batch is written: the new objects hold no cycles, and collections
+        triggered by millions of fresh allocations dominate bulk loads.
+        """
+        batch = list(users)
+        seen = set()
+        id_for_email = self._store.id_for_email
+        for _, email in batch:
+            if email in seen or id_for_email(email) is not None:
+                raise ValueError(f"Email {email} is already in use.")
+            seen.add(email)
+        first_id = self._next_id
+        self._next_id += len(batch)
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            users = self._store.insert_many(first_id, batch)
+            if self._names is not None:
+                self._names.add_many(name for name, _ in batch)
+            return users
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
     def get(self, user_id: int) -> Optional[User]:
-        for user in self._users:
-            if user.id == user_id:
-                return user
-        return None
+        return self._store.get(user_id)
+
+    def get_many(self, user_ids: Iterable[int]) -> List[Optional[User]]:
+        """Return users in the order of user_ids, with None for unknown ids."""
+        get = self._store.get
+        return [get(user_id) for user_id in user_ids]
     
     def getUserById(self, user_id: int) -> Optional[User]:
-        return next((user for user in self._users if user.id == user_id), None)
+        return self._store.get(user_id)
     
     def searchByName(self, name: str) -> List[User]:
-            name_lower = name.lower()
-            return [user for user in self._users if user.name.lower() == name_lower]
+        return self._store.find_by_name(name)
+
+    def _users_for(self, names: Iterable[str], limit: Optional[int]) -> List[User]:
+        users: List[User] = []
+        for key in names:
+            users.extend(self._store.find_by_name(key))
+            if limit is not None and len(users) >= limit:
+                return users[:limit]
+        return users
+
+    def searchByPrefix(self, prefix: str, limit: Optional[int] = 20) -> List[User]:
+        """Type-ahead search: users whose name starts with prefix (case-insensitive)."""
+        return self._users_for(self._name_index().prefix(prefix), limit)
+
+    def searchContaining(self, text: str, limit: Optional[int] = 20) -> List[User]:
+        """Users whose name contains text (case-insensitive)."""
+        return self._users_for(self._name_index().containing(text, limit), limit)
+
+    def searchFuzzy(self, text: str, limit: Optional[int] = 20, min_score: float = 0.3) -> List[User]:
+        """Users whose name is similar to text, best trigram matches first."""
+        matches = self._name_index().fuzzy(text, limit=limit or len(self._store), min_score=min_score)
+        return self._users_for((key for _, key in matches), limit)
     
     def list(self) -> List[User]:
-        return list(self._users)
+        return list(self._store)
+
+    def delete(self, user_id: int) -> bool:
+        user = self._store.remove(user_id)
+        if user is None:
+            return False
+        if self._names is not None:
+            self._names.remove(user.name)
+        return True
+
+    def delete_many(self, user_ids: Iterable[int]) -> int:
+        """Delete every id in user_ids and return how many users were removed."""
+        return sum(1 for user_id in user_ids if self.delete(user_id))
+
+
+class ConcurrentUserService(UserService):
+    """UserService that can be shared across threads.
+
+    Reads (get, get_many, getUserById, searchByName, list) take no lock:
+    each one is a dict/array lookup that is atomic under the GIL, and the
+    stores never expose a half-written user. Writes use three kinds of lock
+    so that unrelated work overlaps:
+
+    - ``_stripes``: one lock per hash(email) bucket, held from the uniqueness
+      check until the user is fully indexed, so two adds of the same email
+      cannot both pass the check;
+    - ``_store_lock``: id allocation plus the store write, kept short;
+    - ``_names_lock``: the NameIndex (if any), whose sorted lists cannot be
+      read while their chunks split. Prefix/substring/fuzzy searches take it too.
+
+    Locks are always taken in stripe -> store -> names order.
+    """
+
+    def __init__(self, store=None, stripes: int = 64, name_index: bool = False):
+        super().__init__(store, name_index)
+        self._stripes = [threading.Lock() for _ in range(stripes)]
+        self._store_lock = threading.Lock()
+        self._names_lock = threading.Lock()
+
+    def _stripe(self, email: str) -> threading.Lock:
+        return self._stripes[hash(email) % len(self._stripes)]
+
+    def add(self, name: str, email: str) -> User:
+        with self._stripe(email):
+            if self._store.id_for_email(email) is not None:
+                raise ValueError(f"Email {email} is already in use.")
+            with self._store_lock:
+                user = self._store.insert(self._next_id, name, email)
+                self._next_id += 1
+            if self._names is not None:
+                with self._names_lock:
+                    self._names.add(name)
+            return user
+
+    def add_many(self, users: Iterable[Tuple[str, str]]) -> List[User]:
+        batch = list(users)
+        stripes = sorted({hash(email) % len(self._stripes) for _, email in batch})
+        held = []
+        try:
+            for i in stripes:
+                self._stripes[i].acquire()
+                held.append(self._stripes[i])
+            seen = set()
+            for _, email in batch:
+                if email in seen or self._store.id_for_email(email) is not None:
+                    raise ValueError(f"Email {email} is already in use.")
+                seen.add(email)
+            with self._store_lock:
+                first_id = self._next_id
+                self._next_id += len(batch)
+                created = self._store.insert_many(first_id, batch)
+            if self._names is not None:
+                with self._names_lock:
+                    self._names.add_many(name for name, _ in batch)
+            return created
+        finally:
+            for lock in held:
+                lock.release()
+
+    def delete(self, user_id: int) -> bool:
+        with self._store_lock:
+            user = self._store.remove(user_id)
+        if user is None:
+            return False
+        if self._names is not None:
+            # Waiting on the stripe guarantees the add that created this user
+            # has finished indexing its name before we unindex it.
+            with self._stripe(user.email), self._names_lock:
+                self._names.remove(user.name)
+        return True
+
+    def searchByPrefix(self, prefix: str, limit: Optional[int] = 20) -> List[User]:
+        names = self._name_index()
+        with self._names_lock:
+            keys = list(itertools.islice(names.prefix(prefix), limit))
+        return self._users_for(keys, limit)
+
+    def searchContaining(self, text: str, limit: Optional[int] = 20) -> List[User]:
+        names = self._name_index()
+        with self._names_lock:
+            keys = names.containing(text, limit)
+        return self._users_for(keys, limit)
+
+    def searchFuzzy(self, text: str, limit: Optional[int] = 20, min_score: float = 0.3) -> List[User]:
+        names = self._name_index()
+        with self._names_lock:
+            matches = names.fuzzy(text, limit=limit or len(self._store), min_score=min_score)
+        return self._users_for((key for _, key in matches), limit)
+
+class AsyncUserService:
+    """asyncio facade over a ConcurrentUserService.
+
+    O(1) reads run inline on the event loop. Writes, which may wait on a lock,
+    and the CPU-heavy name searches run in the default thread pool via
+    ``asyncio.to_thread`` so they never block other coroutines.
+    """
+
+    def __init__(self, service: Optional[ConcurrentUserService] = None):
+        self.service = service if service is not None else ConcurrentUserService()
+
+    async def add(self, name: str, email: str) -> User:
+        return await asyncio.to_thread(self.service.add, name, email)
+
+    async def add_many(self, users: Iterable[Tuple[str, str]]) -> List[User]:
+        return await asyncio.to_thread(self.service.add_many, list(users))
+
+    async def get(self, user_id: int) -> Optional[User]:
+        return self.service.get(user_id)
+
+    async def get_many(self, user_ids: Iterable[int]) -> List[Optional[User]]:
+        return self.service.get_many(user_ids)
+
+    async def searchByName(self, name: str) -> List[User]:
+        return self.service.searchByName(name)
+
+    async def searchByPrefix(self, prefix: str, limit: Optional[int] = 20) -> List[User]:
+        return await asyncio.to_thread(self.service.searchByPrefix, prefix, limit)
+
+    async def searchContaining(self, text: str, limit: Optional[int] = 20) -> List[User]:
+        return await asyncio.to_thread(self.service.searchContaining, text, limit)
+
+    async def searchFuzzy(self, text: str, limit: Optional[int] = 20, min_score: float = 0.3) -> List[User]:
+        return await asyncio.to_thread(self.service.searchFuzzy, text, limit, min_score)
+
+    async def list(self) -> List[User]:
+        return self.service.list()
+
+    async def delete(self, user_id: int) -> bool:
+        return await asyncio.to_thread(self.service.delete, user_id)
+
+    async def delete_many(self, user_ids: Iterable[int]) -> int:
+        return await asyncio.to_thread(self.service.delete_many, list(user_ids))
+
+
+SNAPSHOT_MAGIC = b'USRSNAP2'
+LOG_MAGIC = b'USRLOG02'
+_SNAPSHOT_HEADER = struct.Struct('<8sQQQ')  # magic, next_id, user count, log generation
+_LOG_HEADER = struct.Struct('<8sQ')         # magic, generation
+_LOG_RECORD = struct.Struct('<cQII')        # op, user id, name bytes, email bytes
+_MAX_FIELD = 2 ** 32 - 1
+
+def _pack_strings(values: Iterable[str]) -> Tuple[array, bytes]:
+    """Encode strings as an array('Q') offset table plus one UTF-8 blob."""
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = array('Q', [0])
+    total = 0
+    for item in encoded:
+        total += len(item)
+        offsets.append(total)
+    return offsets, b''.join(encoded)
+
+def save_snapshot(service: UserService, path: str, generation: int = 0) -> None:
+    """Write every user to path as a columnar binary snapshot.
+
+    Layout: header, ids as array('Q'), then names and emails each as an
+    offset table followed by a blob. The file is written next to path and
+    renamed over it, so a crash never leaves a torn snapshot. generation is
+    the change log generation that starts after this snapshot (see
+    PersistentUserService).
+    """
+    users = service.list()
+    ids = array('Q', (user.id for user in users))
+    name_offsets, name_blob = _pack_strings(user.name for user in users)
+    email_offsets, email_blob = _pack_strings(user.email for user in users)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, service._next_id, len(users), generation))
+        for chunk in (ids, name_offsets, name_blob, email_offsets, email_blob):
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _restore(service: UserService, ids: array, names: List[str], emails: List[str]) -> None:
+    """Bulk-insert users with known ids, one insert_many call per run of consecutive ids."""
+    if ids and ids[-1] - ids[0] + 1 == len(ids):
+        runs = [(0, len(ids))]  # no gaps: the common case right after a checkpoint
+    else:
+        runs = []
+        start = 0
+        for end in range(1, len(ids) + 1):
+            if end == len(ids) or ids[end] != ids[end - 1] + 1:
+                runs.append((start, end))
+                start = end
+    for start, end in runs:
+        service._store.insert_many(ids[start], list(zip(names[start:end], emails[start:end])))
+    if service._names is not None:
+        service._names.add_many(names)
+
+def load_snapshot(path: str, service: Optional[UserService] = None) -> UserService:
+    """Fill service (a new UserService by default) from a snapshot written by save_snapshot.
+
+    The file is memory-mapped and read front to back once; every column is
+    copied out with a single ``frombytes`` or slice.
+    """
+    service = service if service is not None else UserService()
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        magic, next_id, count, _ = _SNAPSHOT_HEADER.unpack_from(mm, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a user snapshot")
+        pos = _SNAPSHOT_HEADER.size
+
+        def take_array(length: int) -> array:
+            nonlocal pos
+            values = array('Q')
+            values.frombytes(mm[pos:pos + length * values.itemsize])
+            pos += length * values.itemsize
+            return values
+
+        def take_strings() -> List[str]:
+            nonlocal pos
+            offsets = take_array(count + 1)
+            blob = mm[pos:pos + offsets[-1]]
+            pos += offsets[-1]
+            bounds = zip(offsets, itertools.islice(offsets, 1, None))
+            if blob.isascii():
+                # Byte offsets are character offsets: decode once, then slice.
+                text = blob.decode('ascii')
+                return [text[a:b] for a, b in bounds]
+            return [blob[a:b].decode('utf-8') for a, b in bounds]
+
+        ids = take_array(count)
+        names = take_strings()
+        emails = take_strings()
+
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        _restore(service, ids, names, emails)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    service._next_id = max(service._next_id, next_id)
+    return service
+
+def snapshot_generation(path: str) -> int:
+    """The log generation recorded in a snapshot's header."""
+    with open(path, 'rb') as f:
+        header = f.read(_SNAPSHOT_HEADER.size)
+    if len(header) < _SNAPSHOT_HEADER.size or header[:8] != SNAPSHOT_MAGIC:
+        raise ValueError(f"{path} is not a user snapshot")
+    return _SNAPSHOT_HEADER.unpack(header)[3]
+
+def _encode_fields(name: str, email: str) -> Tuple[bytes, bytes]:
+    name_bytes, email_bytes = name.encode('utf-8'), email.encode('utf-8')
+    if len(name_bytes) > _MAX_FIELD or len(email_bytes) > _MAX_FIELD:
+        raise ValueError("name and email must each be under 4 GiB of UTF-8")
+    return name_bytes, email_bytes
+
+class PersistentUserService(UserService):
+    """UserService that survives restarts: snapshot plus append-only change log.
+
+    Every successful add/delete appends one small record to ``users.log``.
+    On startup the snapshot (``users.snap``) is loaded and the log replayed;
+    ``checkpoint()`` writes a fresh snapshot and empties the log. A torn
+    record at the end of the log (crash mid-write) is dropped on replay.
+
+    The log starts with a generation number and the snapshot header records
+    the generation of the log that follows it. checkpoint() writes the
+    snapshot for generation g + 1 before truncating the generation g log, so
+    a crash in between leaves an older log that replay recognises as already
+    folded into the snapshot and skips.
+    """
+
+    def __init__(self, directory: str, store=None, fsync: bool = False, name_index: bool = False):
+        super().__init__(store, name_index)
+        os.makedirs(directory, exist_ok=True)
+        self.snapshot_path = os.path.join(directory, 'users.snap')
+        self.log_path = os.path.join(directory, 'users.log')
+        self._fsync = fsync
+        self._generation = 0
+        if os.path.exists(self.snapshot_path):
+            self._generation = snapshot_generation(self.snapshot_path)
+            load_snapshot(self.snapshot_path, self)
+        if self._replay():
+            self._log = open(self.log_path, 'ab')
+        else:
+            self._start_log()
+
+    def _start_log(self) -> None:
+        """Replace the log with an empty one for the current generation."""
+        self._log = open(self.log_path, 'wb')
+        self._log.write(_LOG_HEADER.pack(LOG_MAGIC, self._generation))
+        self._sync()
+
+    def _sync(self) -> None:
+        self._log.flush()
+        if self._fsync:
+            os.fsync(self._log.fileno())
+
+    def _replay(self) -> bool:
+        """Apply the log if it belongs to the snapshot's generation; True if it did."""
+        if not os.path.exists(self.log_path):
+            return False
+        with open(self.log_path, 'rb') as f:
+            data = f.read()
+        if len(data) < _LOG_HEADER.size:
+            return False  # crashed while starting a new log
+        magic, generation = _LOG_HEADER.unpack_from(data, 0)
+        if magic != LOG_MAGIC:
+            raise ValueError(f"{self.log_path} is not a user change log")
+        if generation != self._generation:
+            return False  # already folded into the snapshot by checkpoint()
+        pos = _LOG_HEADER.size
+        while pos + _LOG_RECORD.size <= len(data):
+            op, user_id, name_len, email_len = _LOG_RECORD.unpack_from(data, pos)
+            end = pos + _LOG_RECORD.size + name_len + email_len
+            if end > len(data):
+                break
+            if op == b'A':
+                body = data[pos + _LOG_RECORD.size:end]
+                name = body[:name_len].decode('utf-8')
+                self._store.insert(user_id, name, body[name_len:].decode('utf-8'))
+                if self._names is not None:
+                    self._names.add(name)
+                self._next_id = max(self._next_id, user_id + 1)
+            elif op == b'D':
+                UserService.delete(self, user_id)
+            else:
+                break
+            pos = end
+        if pos != len(data):
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(pos)
+        return True
+
+    @staticmethod
+    def _record(op: bytes, user_id: int, name_bytes: bytes = b'', email_bytes: bytes = b'') -> bytes:
+        return _LOG_RECORD.pack(op, user_id, len(name_bytes), len(email_bytes)) + name_bytes + email_bytes
+
+    def add(self, name: str, email: str) -> User:
+        fields = _encode_fields(name, email)  # fail before touching memory or the log
+        user = super().add(name, email)
+        self._log.write(self._record(b'A', user.id, *fields))
+        self._sync()
+        return user
+
+    def add_many(self, users: Iterable[Tuple[str, str]]) -> List[User]:
+        batch = list(users)
+        fields = [_encode_fields(name, email) for name, email in batch]
+        created = super().add_many(batch)
+        self._log.write(b''.join(self._record(b'A', user.id, *pair) for user, pair in zip(created, fields)))
+        self._sync()
+        return created
 
     def delete(self, user_id: int) -> bool:
-        for i, user in enumerate(self._users):
-            if user.id == user_id:
-                del self._users[i]
-                return True
-        return False
+        deleted = super().delete(user_id)
+        if deleted:
+            self._log.write(self._record(b'D', user_id))
+            self._sync()
+        return deleted
+
+    def checkpoint(self) -> None:
+        """Write a snapshot of the current state and start an empty log."""
+        save_snapshot(self, self.snapshot_path, self._generation + 1)
+        self._generation += 1
+        self._log.close()
+        self._start_log()
+
+    def close(self) -> None:
+        self._log.close()
+
+
+def benchmark_service(sizes=(10_000, 100_000, 1_000_000)) -> None:
+    """Show that inserts and lookups cost the same per operation at every size."""
+    print("=== UserService benchmark ===")
+    for label, store_cls in [("dict   ", DictUserStore), ("compact", CompactUserStore)]:
+        for n in sizes:
+            _benchmark_one(label, store_cls, n)
+
+def _benchmark_one(label: str, store_cls, n: int) -> None:
+    """Time add, get, searchByName and delete for n users in one store."""
+    service = UserService(store_cls())
+    start = time.perf_counter()
+    for i in range(n):
+        service.add(f"user{i // 10}", f"user{i}@example.com")  # 10 users per name
+    insert = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(1, n + 1):
+        service.get(i)
+    lookup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(1000):
+        service.searchByName(f"USER{i}")
+    search = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(1, n + 1):
+        service.delete(i)
+    delete = time.perf_counter() - start
+
+    print(f"{label} n={n:>9,}: add {insert / n * 1e9:6.0f} ns/op, get {lookup / n * 1e9:6.0f} ns/op, "
+          f"delete {delete / n * 1e9:6.0f} ns/op, searchByName {search / 1000 * 1e6:6.1f} us/op")
+
+
+def benchmark_bulk(n: int = 200_000) -> None:
+    """Compare per-item add/get/delete loops with the batch APIs."""
+    print(f"=== Bulk APIs ({n:,} users) ===")
+    pairs = [(f"user{i // 10}", f"user{i}@example.com") for i in range(n)]
+    ids = range(1, n + 1)
+    for store_cls in (DictUserStore, CompactUserStore):
+        single, bulk = UserService(store_cls()), UserService(store_cls())
+        timings = []
+        for loop, batch in [
+            (lambda: [single.add(name, email) for name, email in pairs], lambda: bulk.add_many(pairs)),
+            (lambda: [single.get(i) for i in ids], lambda: bulk.get_many(ids)),
+            (lambda: [single.delete(i) for i in ids], lambda: bulk.delete_many(ids)),
+        ]:
+            start = time.perf_counter()
+            loop()
+            middle = time.perf_counter()
+            batch()
+            timings.append((middle - start, time.perf_counter() - middle))
+        print(f"{store_cls.__name__:<17} " + ", ".join(
+            f"{op} {a:.2f}s -> {b:.2f}s" for op, (a, b) in zip(("add", "get", "delete"), timings)))
+
+def _random_name(rng: random.Random) -> str:
+    consonants, vowels = "bcdghklmnpqrstvxy", "aeiouy"
+    def word(syllables: int) -> str:
+        return "".join(rng.choice(consonants) + rng.choice(vowels) for _ in range(syllables))
+    return f"{word(2).title()} {word(3).title()}"
+
+def benchmark_search(n: int = 300_000, queries: int = 200, store_cls=DictUserStore) -> None:
+    """Time prefix, substring and fuzzy name queries against n users (mean and worst)."""
+    rng = random.Random(42)
+    service = UserService(store_cls(), name_index=True)
+    service.add_many((_random_name(rng), f"user{i}@example.com") for i in range(n))
+    names = [user.name for user in service.get_many(rng.sample(range(1, n + 1), queries))]
+    print(f"=== Name search ({n:,} users, {len(service._names):,} distinct names) ===")
+    for label, search, make_query in [
+        ("searchByPrefix", service.searchByPrefix, lambda name: name[:4]),
+        ("searchContaining", service.searchContaining, lambda name: name[3:8]),
+        ("  7-char query", service.searchContaining, lambda name: name[3:10]),
+        ("  3-char query", service.searchContaining, lambda name: name[3:6]),
+        ("  2-char query", service.searchContaining, lambda name: name[3:5]),
+        ("  1-char query", service.searchContaining, lambda name: name[3]),
+        ("searchFuzzy", service.searchFuzzy, lambda name: name[:-1] + "x"),
+        ("  typo mid-name", service.searchFuzzy, lambda name: name[:5] + "x" + name[6:]),
+        ("  partial name", service.searchFuzzy, lambda name: name[:-3]),
+    ]:
+        timings = []
+        for name in names:
+            query = make_query(name)
+            start = time.perf_counter()
+            search(query, limit=20)
+            timings.append(time.perf_counter() - start)
+        print(f"{label:<17} {sum(timings) / queries * 1e3:7.3f} ms/query, worst {max(timings) * 1e3:6.3f} ms")
+
+def _stress_worker(service: ConcurrentUserService, worker: int, ops: int, emails: int) -> int:
+    """Mixed workload: adds racing on a shared email pool, reads, deletes."""
+    rng = random.Random(worker)
+    done = 0
+    for _ in range(ops):
+        roll = rng.random()
+        if roll < 0.4:
+            try:
+                service.add(f"user{rng.randrange(1000)}", f"user{rng.randrange(emails)}@example.com")
+            except ValueError:
+                pass
+        elif roll < 0.9:
+            service.get(rng.randrange(1, service._next_id + 1))
+        elif roll < 0.97:
+            service.searchByName(f"user{rng.randrange(1000)}")
+        else:
+            service.delete(rng.randrange(1, service._next_id + 1))
+        done += 1
+    return done
+
+def benchmark_concurrency(workers=(1, 4, 16, 64), total_ops: int = 200_000) -> None:
+    """Throughput of ConcurrentUserService under threads, then an integrity check."""
+    print(f"=== ConcurrentUserService stress ({total_ops:,} ops) ===")
+    for store_cls, count in itertools.product((DictUserStore, CompactUserStore), workers):
+        service = ConcurrentUserService(store_cls())
+        emails = total_ops // 4  # plenty of duplicate-email races
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=count) as pool:
+            futures = [pool.submit(_stress_worker, service, w, total_ops // count, emails)
+                       for w in range(count)]
+            ops = sum(f.result() for f in futures)
+        elapsed = time.perf_counter() - start
+        users = service.list()
+        assert len({u.id for u in users}) == len(users), "duplicate ids"
+        assert len({u.email for u in users}) == len(users), "duplicate emails"
+        print(f"{store_cls.__name__:<16} {count:>3} workers: {ops / elapsed:>10,.0f} ops/s, "
+              f"{len(users):,} users, invariants ok")
+
+def benchmark_warm_start(n: int = 500_000) -> None:
+    """Compare rebuilding with add() against loading a snapshot and replaying a log."""
+    print(f"=== Warm start ({n:,} users) ===")
+    pairs = [(f"user{i // 10}", f"user{i}@example.com") for i in range(n)]
+    start = time.perf_counter()
+    cold = UserService()
+    for name, email in pairs:
+        cold.add(name, email)
+    print(f"rebuild with add()      {time.perf_counter() - start:.2f}s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = PersistentUserService(tmp)
+        service.add_many(pairs)
+        service.checkpoint()
+        for i in range(1, n // 100):
+            service.delete(i)                    # leave 1% of changes in the log
+        service.close()
+        for store_cls in (DictUserStore, CompactUserStore):
+            start = time.perf_counter()
+            warm = PersistentUserService(tmp, store_cls())
+            print(f"snapshot + log replay   {time.perf_counter() - start:.2f}s into {store_cls.__name__} "
+                  f"({os.path.getsize(warm.snapshot_path) / 1e6:.1f} MB snapshot)")
+            warm.close()
+
+def memory_per_user(store_cls, n: int = 200_000, name_index: bool = False) -> float:
+    """Return traced bytes per user for n users with random names in the given store."""
+    rng = random.Random(42)
+    tracemalloc.start()
+    service = UserService(store_cls(), name_index)
+    for i in range(n):
+        service.add(_random_name(rng), f"user{i}@example.com")
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / n
+
+def benchmark_memory(n: int = 200_000) -> None:
+    print(f"=== Bytes per user ({n:,} users) ===")
+    for store_cls in (DictUserStore, CompactUserStore):
+        print(f"{store_cls.__name__:<17} {memory_per_user(store_cls, n):6.0f} B/user, "
+              f"{memory_per_user(store_cls, n, name_index=True):6.0f} B/user with name_index=True")
 
 
 if __name__ == "__main__":
@@ -56,4 +1205,10 @@ if __name__ == "__main__":
     print(service.getUserById(user1.id))
     print(service.get(user1.id))
     service.searchByName("alice")
-    service.searchByName("ALICE")
\ No newline at end of file
+    service.searchByName("ALICE")
+    benchmark_service()
+    benchmark_bulk()
+    benchmark_search()
+    benchmark_concurrency()
+    benchmark_warm_start()
+    benchmark_memory()
@@ -1,17 +1,191 @@
+import asyncio
+import bisect
+import bz2
+import functools
+import gzip
+import io
 import itertools
-from typing import Iterator, Callable
+import json
+import lzma
+import mmap
+import multiprocessing
+import os
+import re
+import struct
+import tempfile
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import (Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Iterator, List,
+                    NamedTuple, Optional, Sequence, Tuple, Union)
+
+Stage = Callable[[Iterator[str]], Iterator[str]]
+
+_DECOMPRESSORS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+READ_BUFFER_SIZE = 1 << 20
+
+def is_compressed(filepath: str) -> bool:
+    """Return True if filepath is a .gz, .bz2 or .xz log."""
+    return os.path.splitext(filepath)[1] in _DECOMPRESSORS
+
+def open_log(filepath: str, buffer_size: int = READ_BUFFER_SIZE) -> io.BufferedReader:
+    """Open a log for binary reading, decompressing .gz/.bz2/.xz on the fly.
+    The decompressor is wrapped in a BufferedReader so it is asked for
+    buffer_size bytes at a time instead of the small default.
+    Args:
+        filepath (str): Path to the log file.
+        buffer_size (int): Read buffer size in bytes.
+    Returns:
+        io.BufferedReader: A binary stream of the uncompressed content.
+    """
+    opener = _DECOMPRESSORS.get(os.path.splitext(filepath)[1])
+    if opener is None:
+        return open(filepath, 'rb', buffering=buffer_size)
+    return io.BufferedReader(opener(filepath, 'rb'), buffer_size)
 
 def read_log_lines(filepath: str) -> Iterator[str]:
     """Generator: yield each line in a large log file. 
+    .gz, .bz2 and .xz files are decompressed while streaming.
     Args:
         filepath (str): Path to the log file.
     Yields:
         str: Each line in the log file, stripped of trailing newline characters.
     """
-    with open(filepath, 'r', encoding='utf-8') as f:
+    with io.TextIOWrapper(open_log(filepath), encoding='utf-8') as f:
         for line in f:
             yield line.rstrip('\n')
 
+def read_matching_lines(filepath: str, needle: str = 'ERROR') -> Iterator[str]:
+    """Generator: yield only the lines containing needle, searching raw bytes.
+    Equivalent to filter_errors(read_log_lines(filepath)) when needle is 'ERROR',
+    but the file is memory-mapped and scanned with mmap.find, so the ~99% of
+    lines that do not match are never decoded or copied.
+    Compressed logs cannot be mapped; they are decompressed in large blocks
+    and each block is searched the same way.
+    Args:
+        filepath (str): Path to the log file.
+        needle (str): Substring to look for.
+    Yields:
+        str: Each matching line, without its trailing newline (or CRLF).
+    """
+    pattern = needle.encode('utf-8')
+    if is_compressed(filepath):
+        yield from _matching_lines_in_stream(filepath, pattern)
+        return
+    if os.path.getsize(filepath) == 0:
+        return
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        pos = 0
+        while True:
+            hit = mm.find(pattern, pos)
+            if hit == -1:
+                return
+            start = mm.rfind(b'\n', 0, hit) + 1
+            end = mm.find(b'\n', hit)
+            if end == -1:
+                end = size
+            line = mm[start:end]
+            if line.endswith(b'\r'):
+                line = line[:-1]
+            yield line.decode('utf-8')
+            pos = end + 1
+
+def _matching_lines_in_stream(filepath: str, pattern: bytes,
+                              block_size: int = 4 * READ_BUFFER_SIZE) -> Iterator[str]:
+    """Block-at-a-time version of read_matching_lines for streams that cannot be mapped."""
+    with open_log(filepath) as f:
+        carry = b''
+        while True:
+            block = f.read(block_size)
+            if not block:
+                data, carry = carry, b''
+            else:
+                data = carry + block
+                cut = data.rfind(b'\n') + 1
+                data, carry = data[:cut], data[cut:]
+            pos = 0
+            while True:
+                hit = data.find(pattern, pos)
+                if hit == -1:
+                    break
+                start = data.rfind(b'\n', 0, hit) + 1
+                end = data.find(b'\n', hit)
+                if end == -1:
+                    end = len(data)
+                line = data[start:end]
+                if line.endswith(b'\r'):
+                    line = line[:-1]
+                yield line.decode('utf-8')
+                pos = end + 1
+            if not block:
+                return
+
+def _decompress_worker(filepath: str, queue: Any, chunk_lines: int) -> None:
+    """Process target: stream one log's lines into queue in chunks, then None."""
+    try:
+        chunk: List[str] = []
+        for line in read_log_lines(filepath):
+            chunk.append(line)
+            if len(chunk) == chunk_lines:
+                queue.put(chunk)
+                chunk = []
+        if chunk:
+            queue.put(chunk)
+        queue.put(None)
+    except Exception as exc:  # surfaced in the consumer
+        queue.put(exc)
+
+def read_logs_parallel(paths: Sequence[str], workers: Optional[int] = None,
+                       chunk_lines: int = 10_000, queue_chunks: int = 8) -> Iterator[str]:
+    """Generator: yield lines from several (compressed) logs, decompressing them in parallel.
+    Up to `workers` files are decompressed at once, each in its own process
+    writing to a bounded queue, while lines are yielded in file order into
+    the caller's pipeline. Files ahead of the one being consumed stop once
+    their queue holds queue_chunks chunks, so memory stays bounded.
+    Args:
+        paths (Sequence[str]): Log files, in the order their lines should appear.
+        workers (int): Files decompressed concurrently (defaults to os.cpu_count()).
+        chunk_lines (int): Lines per message sent from a worker.
+        queue_chunks (int): Chunks buffered per file.
+    Yields:
+        str: Each line of each file, like read_log_lines.
+    """
+    ctx = multiprocessing.get_context()
+    workers = workers or os.cpu_count() or 1
+    pending = deque(paths)
+    active: deque = deque()
+
+    def start_next() -> None:
+        queue = ctx.Queue(maxsize=queue_chunks)
+        process = ctx.Process(target=_decompress_worker,
+                              args=(pending.popleft(), queue, chunk_lines), daemon=True)
+        process.start()
+        active.append((process, queue))
+
+    try:
+        while pending and len(active) < workers:
+            start_next()
+        while active:
+            process, queue = active[0]
+            while True:
+                chunk = queue.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield from chunk
+            process.join()
+            active.popleft()
+            if pending:
+                start_next()
+    finally:
+        for process, _ in active:
+            process.terminate()
+            process.join()
+
 def filter_errors(lines: Iterator[str]) -> Iterator[str]:
     """Yield lines containing 'ERROR'.
     Args:
@@ -39,15 +213,654 @@ def aggregate_count(lines: Iterator[str]) -> int:
         int: The count of lines."""
     return sum(1 for _ in lines)
 
+_LEVEL_RE = re.compile(r'\b(DEBUG|INFO|WARN(?:ING)?|ERROR|CRITICAL|FATAL)\b')
+_NUMBER_RE = re.compile(r'\d+')
+
+class CountSink:
+    """Count every line."""
+
+    def __init__(self):
+        self.count = 0
+
+    def send(self, line: str) -> None:
+        self.count += 1
+
+    def result(self) -> int:
+        return self.count
+
+class FirstNSink:
+    """Keep the first n lines."""
+
+    def __init__(self, n: int):
+        self.n = n
+        self.lines: List[str] = []
+
+    def send(self, line: str) -> None:
+        if len(self.lines) < self.n:
+            self.lines.append(line)
+
+    def result(self) -> List[str]:
+        return self.lines
+
+class LevelHistogramSink:
+    """Count lines per log level (first DEBUG/INFO/WARN/ERROR/... token)."""
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+
+    def send(self, line: str) -> None:
+        match = _LEVEL_RE.search(line)
+        level = match.group(1) if match else 'UNKNOWN'
+        self.counts[level] = self.counts.get(level, 0) + 1
+
+    def result(self) -> Dict[str, int]:
+        return self.counts
+
+class TopKMessagesSink:
+    """Approximate top-k most frequent messages in bounded memory.
+    The message is the text after the level token, with numbers masked as
+    '#' so "request 17 failed" and "request 42 failed" group together.
+    Counting uses the Misra-Gries summary: at most `capacity` counters are
+    kept, and when a new message arrives with all counters in use every
+    counter is decremented. Any message seen more than n / capacity times is
+    guaranteed to survive; reported counts are lower bounds.
+    """
+
+    def __init__(self, k: int = 10, capacity: int = 1000, mask_numbers: bool = True):
+        self.k = k
+        self.capacity = max(capacity, k)
+        self.mask_numbers = mask_numbers
+        self.counters: Dict[str, int] = {}
+
+    def send(self, line: str) -> None:
+        match = _LEVEL_RE.search(line)
+        message = line[match.end():].strip() if match else line.strip()
+        if self.mask_numbers:
+            message = _NUMBER_RE.sub('#', message)
+        counters = self.counters
+        if message in counters:
+            counters[message] += 1
+        elif len(counters) < self.capacity:
+            counters[message] = 1
+        else:
+            for key in list(counters):
+                if counters[key] == 1:
+                    del counters[key]
+                else:
+                    counters[key] -= 1
+
+    def result(self) -> List[Tuple[str, int]]:
+        return sorted(self.counters.items(), key=lambda item: item[1], reverse=True)[:self.k]
+
+def fan_out(lines: Iterable[str], sinks: Dict[str, Any]) -> Dict[str, Any]:
+    """Feed one stream into several sinks in a single pass.
+    Unlike itertools.tee, nothing is buffered: each line is handed to every
+    sink and dropped, so memory is bounded by what the sinks themselves keep.
+    Args:
+        lines (Iterable[str]): The stream, consumed exactly once.
+        sinks (Dict[str, Any]): Objects with send(line) and result().
+    Returns:
+        Dict[str, Any]: Each sink's result under the same key.
+    """
+    senders = [sink.send for sink in sinks.values()]
+    for line in lines:
+        for send in senders:
+            send(line)
+    return {name: sink.result() for name, sink in sinks.items()}
+
+_RECORD_RE = re.compile(
+    r'(?P<timestamp>\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:[.,]\d{1,6})?)\s+'
+    r'(?P<level>[A-Z]+)\s+(?P<logger>\S+)\s?(?P<message>.*)')
+_EPOCH = datetime(1970, 1, 1)
+
+class LogRecord(NamedTuple):
+    timestamp: datetime
+    level: str
+    logger: str
+    message: str
+    line: str
+
+def parse_record(line: str) -> Optional[LogRecord]:
+    """Parse "<timestamp> <LEVEL> <logger> <message>", or return None.
+    The timestamp may use a space or 'T' and a '.' or ',' fraction (the
+    logging module's default), e.g. "2024-01-01 14:03:07,123 ERROR app.db timeout".
+    """
+    match = _RECORD_RE.match(line)
+    if match is None:
+        return None
+    timestamp, level, logger, message = match.groups()
+    if ',' in timestamp:
+        timestamp = timestamp.replace(',', '.')
+    if '.' in timestamp:
+        seconds, fraction = timestamp.split('.')
+        timestamp = f"{seconds}.{fraction.ljust(6, '0')}"
+    return LogRecord(datetime.fromisoformat(timestamp), level, logger, message, line)
+
+def parse_records(lines: Iterator[str]) -> Iterator[LogRecord]:
+    """Parse each line into a LogRecord, skipping lines that do not match
+    (continuation lines such as stack traces).
+    Args:
+        lines (Iterator[str]): An iterator of log lines.
+    Yields:
+        LogRecord: Structured fields plus the original line.
+    """
+    return (record for record in map(parse_record, lines) if record is not None)
+
+def filter_level(records: Iterator[LogRecord], *levels: str) -> Iterator[LogRecord]:
+    """Yield records whose level is one of levels."""
+    wanted = set(levels)
+    return (record for record in records if record.level in wanted)
+
+def filter_time_range(records: Iterator[LogRecord], start: datetime,
+                      end: datetime) -> Iterator[LogRecord]:
+    """Yield records with start <= timestamp < end."""
+    return (record for record in records if start <= record.timestamp < end)
+
+TIME_INDEX_MAGIC = b'LOGTIDX1'
+_TIME_INDEX_HEADER = struct.Struct('<8sqqQ')  # magic, source mtime_ns, source size, entries
+
+def _first_record_at(f: Any, offset: int) -> Optional[Tuple[int, LogRecord]]:
+    """Return (line offset, record) of the first parseable line starting at or after offset."""
+    f.seek(offset)
+    if offset:
+        f.readline()  # finish the line offset points into
+    while True:
+        pos = f.tell()
+        raw = f.readline()
+        if not raw:
+            return None
+        record = parse_record(raw.decode('utf-8', errors='replace').rstrip('\r\n'))
+        if record is not None:
+            return pos, record
+
+def build_time_index(filepath: str, every: int = 1 << 20,
+                     index_path: Optional[str] = None) -> str:
+    """Write a sparse timestamp -> byte offset index next to a log file.
+    Instead of scanning the log, it seeks to every `every`-th byte and parses
+    the first complete line there, so building the index of a 50 GB log costs
+    ~50k short reads. The log is assumed to be (roughly) in time order.
+    Args:
+        filepath (str): Path to an uncompressed log file.
+        every (int): Byte distance between index entries.
+        index_path (str): Where to write the index (default: filepath + '.tsidx').
+    Returns:
+        str: The index path.
+    """
+    index_path = index_path or filepath + '.tsidx'
+    stat = os.stat(filepath)
+    seconds, offsets = array('d'), array('Q')
+    with open(filepath, 'rb') as f:
+        for target in range(0, stat.st_size, every):
+            found = _first_record_at(f, target)
+            if found is None:
+                break
+            pos, record = found
+            if offsets and pos <= offsets[-1]:
+                continue  # one long line spanned several targets
+            seconds.append((record.timestamp - _EPOCH).total_seconds())
+            offsets.append(pos)
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'wb') as out:
+        out.write(_TIME_INDEX_HEADER.pack(TIME_INDEX_MAGIC, stat.st_mtime_ns, stat.st_size, len(offsets)))
+        out.write(seconds.tobytes())
+        out.write(offsets.tobytes())
+    os.replace(tmp_path, index_path)
+    return index_path
+
+def load_time_index(filepath: str, index_path: Optional[str] = None) -> Tuple[array, array]:
+    """Return (seconds, offsets) arrays, rebuilding the index if the log changed.
+    An index built here is used as is, even if the log grew during the build:
+    a live log may never stop changing, and read_time_range reads on past the
+    last sample to EOF, so appended lines are still found.
+    """
+    index_path = index_path or filepath + '.tsidx'
+    stat = os.stat(filepath)
+    try:
+        with open(index_path, 'rb') as f:
+            data = f.read()
+        magic, mtime_ns, size, entries = _TIME_INDEX_HEADER.unpack_from(data)
+        fresh = magic == TIME_INDEX_MAGIC and (mtime_ns, size) == (stat.st_mtime_ns, stat.st_size)
+    except (FileNotFoundError, struct.error):
+        fresh = False
+    if not fresh:
+        build_time_index(filepath, index_path=index_path)
+        with open(index_path, 'rb') as f:
+            data = f.read()
+        entries = _TIME_INDEX_HEADER.unpack_from(data)[3]
+    seconds, offsets = array('d'), array('Q')
+    pos = _TIME_INDEX_HEADER.size
+    seconds.frombytes(data[pos:pos + entries * 8])
+    offsets.frombytes(data[pos + entries * 8:pos + entries * 16])
+    return seconds, offsets
+
+def read_time_range(filepath: str, start: datetime, end: datetime,
+                    index_path: Optional[str] = None) -> Iterator[LogRecord]:
+    """Generator: yield records with start <= timestamp < end, using the sparse index.
+    The index gives the last sampled offset before start; reading
+    begins there and stops at the first record at or after end, so only
+    the requested window (plus at most one index gap) is read.
+    Args:
+        filepath (str): Path to the log file.
+        start (datetime): Inclusive lower bound.
+        end (datetime): Exclusive upper bound.
+        index_path (str): Index location (default: filepath + '.tsidx').
+    Yields:
+        LogRecord: Matching records in file order.
+    """
+    seconds, offsets = load_time_index(filepath, index_path)
+    # Last sample strictly before start: lines sharing start's timestamp may precede a sample at start.
+    i = bisect.bisect_left(seconds, (start - _EPOCH).total_seconds()) - 1
+    offset = offsets[i] if i >= 0 else 0
+    for record in parse_records(read_log_range(filepath, offset, os.path.getsize(filepath))):
+        if record.timestamp >= end:
+            return
+        if record.timestamp >= start:
+            yield record
+
+def read_log_range(filepath: str, start: int, end: int) -> Iterator[str]:
+    """Generator: yield the lines stored in bytes [start, end) of a log file.
+    start and end must sit on line boundaries (see shard_log_file).
+    Args:
+        filepath (str): Path to the log file.
+        start (int): Offset of the first byte to read.
+        end (int): Offset just past the last byte to read.
+    Yields:
+        str: Each line, decoded and stripped like read_log_lines.
+    """
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        pos = start
+        for raw in f:
+            if pos >= end:
+                return
+            pos += len(raw)
+            if raw.endswith(b'\r\n'):
+                raw = raw[:-2] + b'\n'
+            yield raw.decode('utf-8').rstrip('\n')
+
+def shard_log_file(filepath: str, shard_size: int = 64 << 20) -> List[Tuple[str, int, int]]:
+    """Split a log file into (filepath, start, end) ranges cut on line boundaries.
+    Args:
+        filepath (str): Path to the log file.
+        shard_size (int): Approximate number of bytes per shard.
+    Returns:
+        List[Tuple[str, int, int]]: Shards in file order. A compressed file
+        cannot be split and is returned as one shard with end = -1.
+    """
+    if is_compressed(filepath):
+        return [(filepath, 0, -1)]
+    size = os.path.getsize(filepath)
+    edges = [0]
+    with open(filepath, 'rb') as f:
+        while edges[-1] + shard_size < size:
+            f.seek(edges[-1] + shard_size)
+            f.readline()  # move to the start of the next line
+            if f.tell() >= size:
+                break
+            edges.append(f.tell())
+    edges.append(size)
+    return [(filepath, a, b) for a, b in zip(edges, edges[1:]) if a < b]
+
+_ROTATED_RE = re.compile(r'(?P<base>.+?)(?:\.(?P<number>\d+))?(?:\.gz|\.bz2|\.xz)?')
+
+def _rotation_order(name: str) -> Tuple[str, int, str]:
+    """Sort key putting rotated logs oldest first: app.log.10, ..., app.log.2, app.log.1, app.log.
+    A numeric suffix counts back from the live file, as logrotate and
+    RotatingFileHandler number them; a compression extension is ignored.
+    Files with other bases sort by base name.
+    """
+    name = os.path.basename(name)
+    match = _ROTATED_RE.fullmatch(name)
+    number = match.group('number')
+    return match.group('base'), -int(number) if number is not None else 1, name
+
+def _run_shard(filepath: str, start: int, end: int, stages: Sequence[Stage],
+               collect: bool) -> Tuple[int, List[str]]:
+    """Worker: run the stage chain over one shard and return (count, lines)."""
+    lines: Iterator[str] = (read_log_lines(filepath) if end == -1
+                            else read_log_range(filepath, start, end))
+    for stage in stages:
+        lines = stage(lines)
+    if collect:
+        output = list(lines)
+        return len(output), output
+    return aggregate_count(lines), []
+
+def run_parallel_pipeline(paths: Union[str, Sequence[str]],
+                          stages: Sequence[Stage] = (filter_errors,),
+                          collect: bool = True, ordered: bool = True,
+                          workers: int = None,
+                          shard_size: int = 64 << 20) -> Tuple[int, List[str]]:
+    """Run read -> stages -> aggregate over byte-range shards in a process pool.
+    Each shard runs the same stage functions as the serial pipeline; use
+    functools.partial(transform_lines, func=...) for a transform stage. Stages
+    must be picklable (module-level functions or partials of them).
+    Args:
+        paths: A log file, a directory of rotated logs (read oldest first by
+            numeric suffix: app.log.10, ..., app.log.2, app.log.1, app.log),
+            or an explicit list of files in the order to process.
+            Compressed files are decompressed whole inside one worker each.
+        stages: Stage functions applied in order to each shard's lines.
+        collect (bool): Return the output lines, not just the count.
+        ordered (bool): Merge lines in file order. With False, shard outputs
+            are appended as soon as each worker finishes.
+        workers (int): Process count (defaults to os.cpu_count()).
+        shard_size (int): Approximate bytes per shard.
+    Returns:
+        Tuple[int, List[str]]: Total line count and the merged lines (empty
+        when collect is False).
+    """
+    if isinstance(paths, str):
+        if os.path.isdir(paths):
+            paths = [os.path.join(paths, name) for name in sorted(os.listdir(paths), key=_rotation_order)
+                     if os.path.isfile(os.path.join(paths, name))]
+        else:
+            paths = [paths]
+    shards = [shard for path in paths for shard in shard_log_file(path, shard_size)]
+    total = 0
+    output: List[str] = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_run_shard, *shard, tuple(stages), collect) for shard in shards]
+        for future in (futures if ordered else as_completed(futures)):
+            count, lines = future.result()
+            total += count
+            output.extend(lines)
+    return total, output
+
+def load_checkpoint(checkpoint_path: str) -> Optional[Tuple[int, int]]:
+    """Return the saved (inode, offset), or None if there is no checkpoint yet."""
+    try:
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    return data['inode'], data['offset']
+
+def save_checkpoint(checkpoint_path: str, inode: int, offset: int) -> None:
+    """Atomically record that every line before offset in inode was processed."""
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'inode': inode, 'offset': offset}, f)
+    os.replace(tmp_path, checkpoint_path)
+
+def _find_rotated(filepath: str, inode: int) -> Optional[str]:
+    """Find the file that used to be filepath (e.g. app.log.1) by its inode."""
+    directory = os.path.dirname(filepath) or '.'
+    base = os.path.basename(filepath)
+    for entry in os.scandir(directory):
+        if entry.name.startswith(base) and entry.is_file() and entry.inode() == inode:
+            return entry.path
+    return None
+
+def follow_log_lines(filepath: str, checkpoint_path: Optional[str] = None,
+                     poll_interval: float = 1.0, stop_when_idle: bool = False,
+                     checkpoint_every: int = 10_000) -> Iterator[str]:
+    """Generator: tail a growing log file, surviving rotation and restarts.
+    Only complete lines are yielded; a partially written last line waits
+    for its newline. When filepath is replaced (rotation), the old file is
+    drained until it has been idle for a whole poll_interval before switching
+    to the new one, so lines the app writes to it before reopening its log
+    are not lost; when it shrinks (copytruncate), reading restarts at 0.
+    With checkpoint_path, the (inode, offset) after the last consumed line
+    is saved every checkpoint_every lines and whenever the reader is idle,
+    and a restart resumes from it - in the rotated file if the inode now
+    lives under another name. Lines are processed at least once: a crash
+    between checkpoints replays the lines since the last save.
+    Args:
+        filepath (str): Path to the log file.
+        checkpoint_path (str): Where to persist progress, or None.
+        poll_interval (float): Seconds to sleep when no new data is available.
+        stop_when_idle (bool): Return at EOF instead of waiting (cron mode).
+        checkpoint_every (int): Lines between checkpoint saves.
+    Yields:
+        str: Each new line, decoded and stripped like read_log_lines.
+    """
+    saved = load_checkpoint(checkpoint_path) if checkpoint_path else None
+    current = os.stat(filepath).st_ino
+    path, offset = filepath, 0
+    if saved is not None:
+        inode, saved_offset = saved
+        if inode == current:
+            offset = saved_offset
+        else:
+            rotated = _find_rotated(filepath, inode)
+            if rotated is not None:
+                path, offset = rotated, saved_offset
+
+    f = open(path, 'rb')
+    try:
+        inode = os.fstat(f.fileno()).st_ino
+        if offset > os.fstat(f.fileno()).st_size:
+            offset = 0
+        f.seek(offset)
+        since_save = 0
+        draining = False  # filepath was replaced; waiting out the old file
+        while True:
+            raw = f.readline()
+            if raw.endswith(b'\n'):
+                draining = False
+                offset += len(raw)
+                if raw.endswith(b'\r\n'):
+                    raw = raw[:-2] + b'\n'
+                yield raw.decode('utf-8').rstrip('\n')
+                since_save += 1
+                if checkpoint_path and since_save >= checkpoint_every:
+                    save_checkpoint(checkpoint_path, inode, offset)
+                    since_save = 0
+                continue
+
+            # EOF (or a partial line): rewind over it and look for changes.
+            f.seek(offset)
+            if checkpoint_path and since_save:
+                save_checkpoint(checkpoint_path, inode, offset)
+                since_save = 0
+            try:
+                latest = os.stat(filepath)
+            except FileNotFoundError:
+                latest = None  # between rename and re-create
+            if latest is not None and latest.st_ino != inode:
+                if not draining:
+                    # The writer may not have reopened yet: give the old
+                    # file one more idle poll before leaving it.
+                    draining = True
+                    time.sleep(poll_interval)
+                    continue
+                draining = False
+                f.close()
+                f = open(filepath, 'rb')
+                inode, offset = os.fstat(f.fileno()).st_ino, 0
+                if checkpoint_path:
+                    save_checkpoint(checkpoint_path, inode, offset)
+                continue
+            if latest is not None and latest.st_size < offset:
+                offset = 0
+                f.seek(0)
+                continue
+            if stop_when_idle:
+                return
+            time.sleep(poll_interval)
+    finally:
+        f.close()
+
+def read_new_lines(filepath: str, checkpoint_path: str) -> Iterator[str]:
+    """Generator: yield the lines appended since the last run, then stop.
+    For cron jobs: aggregate_count(filter_errors(read_new_lines(log, ckpt)))
+    only processes bytes written since the previous invocation.
+    """
+    return follow_log_lines(filepath, checkpoint_path, stop_when_idle=True)
+
+def _read_chunk(f: Any, chunk_lines: int) -> List[str]:
+    return [line.rstrip('\n') for line in itertools.islice(f, chunk_lines)]
+
+async def aread_log_lines(filepath: str, chunk_lines: int = 1000) -> AsyncIterator[str]:
+    """Async generator: yield each line of a log file without blocking the loop.
+    Opening, reading (chunk_lines at a time) and closing run in the default
+    thread pool; compressed logs are handled like read_log_lines.
+    Args:
+        filepath (str): Path to the log file.
+        chunk_lines (int): Lines read per thread-pool call.
+    Yields:
+        str: Each line, stripped of its trailing newline.
+    """
+    f = await asyncio.to_thread(lambda: io.TextIOWrapper(open_log(filepath), encoding='utf-8'))
+    try:
+        while True:
+            chunk = await asyncio.to_thread(_read_chunk, f, chunk_lines)
+            if not chunk:
+                return
+            for line in chunk:
+                yield line
+    finally:
+        await asyncio.to_thread(f.close)
+
+async def afilter_errors(lines: AsyncIterable[str]) -> AsyncIterator[str]:
+    """Async version of filter_errors."""
+    async for line in lines:
+        if 'ERROR' in line:
+            yield line
+
+async def atransform_lines(lines: AsyncIterable[str], func: Callable[[str], str]) -> AsyncIterator[str]:
+    """Async version of transform_lines."""
+    async for line in lines:
+        yield func(line)
+
+async def aaggregate_count(lines: AsyncIterable[str]) -> int:
+    """Async version of aggregate_count."""
+    count = 0
+    async for _ in lines:
+        count += 1
+    return count
+
+_DONE = object()
+
+async def _pump(source: AsyncIterable[Any], queue: asyncio.Queue) -> None:
+    try:
+        async for item in source:
+            await queue.put(item)  # waits while the queue is full: backpressure
+    except Exception as exc:
+        await queue.put(exc)
+        return
+    await queue.put(_DONE)
+
+async def abuffered(*sources: AsyncIterable[Any], maxsize: int = 1000) -> AsyncIterator[Any]:
+    """Async generator: run sources as tasks feeding one bounded queue, and yield from it.
+    This decouples a stage from the one before it: producers run ahead by at
+    most maxsize items and then wait, so a slow consumer throttles every
+    upstream stage instead of letting memory grow. With several sources they
+    are consumed concurrently and their items interleave.
+    Args:
+        *sources (AsyncIterable): Upstream stages.
+        maxsize (int): Queue bound.
+    Yields:
+        Any: Items from all sources.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize)
+    tasks = [asyncio.ensure_future(_pump(source, queue)) for source in sources]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            item = await queue.get()
+            if item is _DONE:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def run_async_pipeline(paths: Sequence[str], func: Callable[[str], str] = str.upper,
+                             maxsize: int = 1000) -> int:
+    """Read several logs concurrently on one event loop -> filter -> transform -> count.
+    Stages are joined by bounded queues (abuffered), so reads pause when the
+    downstream stages fall behind.
+    Args:
+        paths (Sequence[str]): Log files, read concurrently.
+        func (Callable[[str], str]): Transform applied to each error line.
+        maxsize (int): Bound of each inter-stage queue.
+    Returns:
+        int: Number of error lines.
+    """
+    lines = abuffered(*(aread_log_lines(path) for path in paths), maxsize=maxsize)
+    errors = abuffered(afilter_errors(lines), maxsize=maxsize)
+    return await aaggregate_count(atransform_lines(errors, func))
+
+def write_sample_log(filepath: str, lines: int, error_every: int = 100) -> None:
+    """Write a synthetic log where one line in error_every is an ERROR.
+    Timestamps start at 2024-01-01 00:00:00 and advance one second every ten lines.
+    """
+    start = datetime(2024, 1, 1)
+    with open(filepath, 'w', encoding='utf-8') as f:
+        for i in range(lines):
+            level = 'ERROR' if i % error_every == 0 else 'INFO'
+            stamp = (start + timedelta(seconds=i // 10)).isoformat(sep=' ')
+            f.write(f"{stamp} {level} app.worker request {i} handled\n")
+
+def benchmark_time_range(lines: int = 1_000_000) -> None:
+    """Errors in a 5-minute window: full scan vs the sparse time index."""
+    window = (datetime(2024, 1, 1, 14, 0), datetime(2024, 1, 1, 14, 5))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.log')
+        write_sample_log(path, lines)
+        start = time.perf_counter()
+        build_time_index(path)
+        print(f"=== Time range query ({lines:,} lines, 14:00-14:05) ===")
+        print(f"{'build_time_index':<36} {time.perf_counter() - start:.3f}s")
+        for label, make in [
+            ("full scan", lambda: filter_time_range(parse_records(read_log_lines(path)), *window)),
+            ("read_time_range", lambda: read_time_range(path, *window)),
+        ]:
+            start = time.perf_counter()
+            count = aggregate_count(filter_level(make(), 'ERROR'))
+            print(f"{label:<36} {time.perf_counter() - start:.3f}s ({count} errors)")
+
+def benchmark_readers(lines: int = 1_000_000) -> None:
+    """Compare the decode-every-line pipeline with the byte-level reader."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.log')
+        write_sample_log(path, lines)
+        print(f"=== Log reader benchmark ({lines:,} lines, 1% ERROR) ===")
+        gz_path = path + '.gz'
+        with open(path, 'rb') as src, gzip.open(gz_path, 'wb', compresslevel=1) as dst:
+            dst.write(src.read())
+        for label, make in [
+            ("filter_errors(read_log_lines)", lambda: filter_errors(read_log_lines(path))),
+            ("read_matching_lines", lambda: read_matching_lines(path)),
+            ("filter_errors(read_log_lines) .gz", lambda: filter_errors(read_log_lines(gz_path))),
+            ("read_matching_lines .gz", lambda: read_matching_lines(gz_path)),
+        ]:
+            start = time.perf_counter()
+            count = aggregate_count(make())
+            print(f"{label:<36} {time.perf_counter() - start:.3f}s ({count} lines)")
+
+        stages = (filter_errors, functools.partial(transform_lines, func=str.upper))
+        for ordered in (True, False):
+            start = time.perf_counter()
+            count, _ = run_parallel_pipeline(path, stages, ordered=ordered, shard_size=4 << 20)
+            label = f"run_parallel_pipeline(ordered={ordered})"
+            print(f"{label:<36} {time.perf_counter() - start:.3f}s ({count} lines)")
+
 if __name__ == "__main__":
+    benchmark_readers()
+    benchmark_time_range()
+
     # Example usage of the pipeline
     filepath = "biglog.log"  # Change to the actual log file
     lines = read_log_lines(filepath)
     error_lines = filter_errors(lines)
     upper_lines = transform_lines(error_lines, str.upper) # Transform to uppercase
-    # Count the number of error lines
-    count = aggregate_count(itertools.tee(upper_lines, 2)[0])
+    # One pass over the file feeds every aggregate (tee would buffer all lines)
+    results = fan_out(upper_lines, {
+        "count": CountSink(),
+        "first": FirstNSink(5),
+        "levels": LevelHistogramSink(),
+        "top": TopKMessagesSink(k=5),
+    })
     # Print the first 5 error lines (transformed)
-    for line in itertools.islice(upper_lines, 5):
+    for line in results["first"]:
         print(line)
-    print(f"Total number of error lines: {count}")
+    print(f"Total number of error lines: {results['count']}")
+    print(f"Lines per level: {results['levels']}")
+    print(f"Top messages: {results['top']}")
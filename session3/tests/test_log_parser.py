@@ -0,0 +1,135 @@
+"""
+Unit tests for the log parser.
+"""
+import gzip
+import os
+from datetime import datetime
+
+import pytest
+
+import log_parser
+from log_parser import (build_time_index, follow_log_lines, parse_records,
+                        read_log_lines, read_new_lines, read_time_range,
+                        run_parallel_pipeline, write_sample_log)
+
+
+@pytest.fixture
+def log(tmp_path):
+    """Path of app.log under tmp_path, plus helpers to append to it and rotate it."""
+    class Log:
+        path = str(tmp_path / "app.log")
+        checkpoint = str(tmp_path / "app.ckpt")
+
+        def append(self, *lines, path=None):
+            with open(path or self.path, "a", encoding="utf-8") as f:
+                f.writelines(line + "\n" for line in lines)
+
+        def rotate(self):
+            """logrotate's default: rename to app.log.1 and create a fresh app.log."""
+            os.rename(self.path, self.path + ".1")
+            open(self.path, "w").close()
+
+    return Log()
+
+
+class TestTimeIndex:
+    """read_time_range against a full scan, including on a log that keeps growing."""
+
+    @staticmethod
+    def _scan(path, start, end):
+        return [r.line for r in parse_records(read_log_lines(path)) if start <= r.timestamp < end]
+
+    def test_matches_full_scan(self, tmp_path):
+        path = str(tmp_path / "app.log")
+        write_sample_log(path, 20_000)
+        build_time_index(path, every=4096)
+        window = (datetime(2024, 1, 1, 0, 10), datetime(2024, 1, 1, 0, 12, 30))
+        assert [r.line for r in read_time_range(path, *window)] == self._scan(path, *window)
+
+    def test_log_growing_during_every_rebuild(self, tmp_path, monkeypatch):
+        """A live log never matches a fresh index; the just-built one is used, not rebuilt forever."""
+        path = str(tmp_path / "app.log")
+        write_sample_log(path, 5_000)
+        build = log_parser.build_time_index
+        builds = []
+
+        def build_then_append(filepath, *args, **kwargs):
+            index_path = build(filepath, *args, **kwargs)
+            builds.append(index_path)
+            with open(filepath, "a", encoding="utf-8") as f:
+                f.write(f"2024-01-01 00:08:20 ERROR app.worker appended {len(builds)}\n")
+            return index_path
+
+        monkeypatch.setattr(log_parser, "build_time_index", build_then_append)
+        window = (datetime(2024, 1, 1, 0, 8), datetime(2024, 1, 1, 0, 9))
+        records = list(read_time_range(path, *window))
+        assert len(builds) == 1
+        assert records[-1].message == "appended 1"
+        assert [r.line for r in records] == self._scan(path, *window)
+
+
+class TestFollowLogLines:
+    """Tailing across rotation, copytruncate and restarts."""
+
+    def test_rotation_keeps_reading_the_old_file_until_it_is_idle(self, log, monkeypatch):
+        log.append("a", "b")
+        lines = follow_log_lines(log.path, poll_interval=0, stop_when_idle=True)
+        assert [next(lines), next(lines)] == ["a", "b"]
+        log.rotate()
+        log.append("new")
+        sleeps = []
+
+        def sleep(seconds):
+            # The app writes to the renamed file until it is told to reopen.
+            if not sleeps:
+                log.append("late-old", path=log.path + ".1")
+            sleeps.append(seconds)
+
+        monkeypatch.setattr(log_parser.time, "sleep", sleep)
+        assert list(lines) == ["late-old", "new"]
+
+    def test_copytruncate_restarts_at_zero(self, log):
+        log.append("a", "b", "c")
+        lines = follow_log_lines(log.path, poll_interval=0, stop_when_idle=True)
+        assert [next(lines) for _ in range(3)] == ["a", "b", "c"]
+        with open(log.path, "w", encoding="utf-8") as f:
+            f.write("d\n")
+        assert list(lines) == ["d"]
+
+    def test_partial_line_waits_for_its_newline(self, log):
+        log.append("a")
+        with open(log.path, "a", encoding="utf-8") as f:
+            f.write("par")
+        assert list(follow_log_lines(log.path, stop_when_idle=True)) == ["a"]
+        log.append("tial")
+        assert list(follow_log_lines(log.path, stop_when_idle=True)) == ["a", "partial"]
+
+    def test_checkpoint_resumes_across_rotation(self, log, monkeypatch):
+        monkeypatch.setattr(log_parser.time, "sleep", lambda seconds: None)
+        log.append("a", "b")
+        assert list(read_new_lines(log.path, log.checkpoint)) == ["a", "b"]
+        log.append("c")
+        log.rotate()
+        log.append("d")
+        # The checkpoint's inode now lives at app.log.1: finish it, then move on.
+        assert list(read_new_lines(log.path, log.checkpoint)) == ["c", "d"]
+        log.append("e")
+        assert list(read_new_lines(log.path, log.checkpoint)) == ["e"]
+        assert list(read_new_lines(log.path, log.checkpoint)) == []
+
+
+class TestParallelPipeline:
+    """run_parallel_pipeline over a directory of rotated logs."""
+
+    def test_directory_is_read_oldest_first(self, tmp_path):
+        for number in [None, 1, 2, 10, 11]:
+            name = "app.log" if number is None else f"app.log.{number}"
+            lines = f"ERROR from {name}\n".encode()
+            if number == 2:
+                with gzip.open(tmp_path / (name + ".gz"), "wb") as f:
+                    f.write(lines)
+            else:
+                (tmp_path / name).write_bytes(lines)
+        count, lines = run_parallel_pipeline(str(tmp_path), workers=2)
+        assert count == 5
+        assert lines == [f"ERROR from app.log{suffix}" for suffix in [".11", ".10", ".2", ".1", ""]]
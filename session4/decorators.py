@@ -1,28 +1,617 @@
+import asyncio
+import inspect
+import os
+import sys
+import threading
 import time
+import timeit
+from array import array
+from collections import OrderedDict
 from functools import wraps
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional
 
 # Function decorator: benchmark
 
 def benchmark(func):
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            result = await func(*args, **kwargs)
+            end = time.perf_counter_ns()
+            print(f"[benchmark] {func.__name__} took {(end - start) / 1e9:.6f}s")
+            return result
+        return async_wrapper
+
     @wraps(func)
     def wrapper(*args, **kwargs):
-        start = time.time()
+        start = time.perf_counter_ns()
         result = func(*args, **kwargs)
-        end = time.time()
-        print(f"[benchmark] {func.__name__} took {end - start:.6f}s")
+        end = time.perf_counter_ns()
+        print(f"[benchmark] {func.__name__} took {(end - start) / 1e9:.6f}s")
         return result
     return wrapper
 
+# Function decorator: profile (benchmark without the per-call print)
+
+_SUB_BUCKETS = 16  # per power of two: ~6% relative precision
+
+def _bucket(ns: int) -> int:
+    if ns < _SUB_BUCKETS:
+        return ns
+    shift = ns.bit_length() - 5
+    return (shift + 1) * _SUB_BUCKETS + (ns >> shift) - _SUB_BUCKETS
+
+def _bucket_upper(index: int) -> int:
+    """Largest duration (ns) that falls into bucket index."""
+    if index < _SUB_BUCKETS:
+        return index
+    shift = index // _SUB_BUCKETS - 1
+    return ((index % _SUB_BUCKETS + _SUB_BUCKETS + 1) << shift) - 1
+
+class _Shard:
+    """Histogram owned by a single thread, so recording needs no lock."""
+
+    __slots__ = ("count", "total", "min", "max", "buckets", "skipped")
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self) -> None:
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self.buckets: Dict[int, int] = {}
+        self.skipped = 0
+
+    def sampled(self, every: int) -> bool:
+        """Deterministic 1-in-every sampling with this thread's counter."""
+        self.skipped += 1
+        if self.skipped < every:
+            return False
+        self.skipped = 0
+        return True
+
+    def record(self, ns: int) -> None:
+        self.count += 1
+        self.total += ns
+        if self.min is None or ns < self.min:
+            self.min = ns
+        if ns > self.max:
+            self.max = ns
+        index = _bucket(ns)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+class FunctionProfile:
+    """Latency histogram for one function, sharded per thread.
+
+    Each thread records into its own _Shard (created on first use and
+    appended to a list, which is atomic), so the hot path takes no lock.
+    snapshot() merges the shards; percentiles are bucket upper bounds.
+    """
+
+    def __init__(self, name: str, sample_rate: float = 1.0):
+        if not 0 < sample_rate <= 1:
+            raise ValueError(f"sample_rate must be in (0, 1], got {sample_rate}")
+        self.name = name
+        self.sample_rate = sample_rate
+        self.sample_every = round(1 / sample_rate)
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+
+    def shard(self) -> _Shard:
+        """This thread's shard (created on first use)."""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            self._shards.append(shard)
+            return shard
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        count, total, low, high = 0, 0, None, 0
+        buckets: Dict[int, int] = {}
+        for shard in list(self._shards):
+            count += shard.count
+            total += shard.total
+            if shard.min is not None and (low is None or shard.min < low):
+                low = shard.min
+            high = max(high, shard.max)
+            for index, n in list(shard.buckets.items()):
+                buckets[index] = buckets.get(index, 0) + n
+        stats: Dict[str, Optional[float]] = {
+            "count": count, "sample_rate": self.sample_rate,
+            "min_ns": low, "mean_ns": total / count if count else None, "max_ns": high if count else None,
+        }
+        for label, q in (("p50_ns", 0.50), ("p95_ns", 0.95), ("p99_ns", 0.99)):
+            stats[label] = None
+            seen, target = 0, q * count
+            for index in sorted(buckets):
+                seen += buckets[index]
+                if seen >= target:
+                    stats[label] = min(_bucket_upper(index), high)
+                    break
+        return stats
+
+    def reset(self) -> None:
+        for shard in list(self._shards):
+            shard.clear()
+
+PROFILES: Dict[str, FunctionProfile] = {}
+
+def profile(func=None, *, sample_rate: float = 1.0, name: Optional[str] = None):
+    """Record call latency into PROFILES[name] instead of printing.
+
+    Usable as @profile or @profile(sample_rate=0.01). Only 1 in
+    round(1 / sample_rate) calls is timed (with perf_counter_ns); the others
+    run straight through. Works for both plain and async functions.
+    """
+    def decorate(func):
+        stats = PROFILES.setdefault(name or func.__qualname__,
+                                    FunctionProfile(name or func.__qualname__, sample_rate))
+        clock = time.perf_counter_ns
+        every = stats.sample_every
+        local = stats._local
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                shard = getattr(local, "shard", None) or stats.shard()
+                if every > 1 and not shard.sampled(every):
+                    return await func(*args, **kwargs)
+                start = clock()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    shard.record(clock() - start)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            shard = getattr(local, "shard", None) or stats.shard()
+            if every > 1 and not shard.sampled(every):
+                return func(*args, **kwargs)
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                shard.record(clock() - start)
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+def profile_stats() -> Dict[str, Dict[str, Optional[float]]]:
+    """Export every profiled function's stats as plain dicts (e.g. for JSON)."""
+    return {name: stats.snapshot() for name, stats in PROFILES.items()}
+
+def dump_profile(file=None) -> None:
+    """Print a table of every profiled function, slowest p99 first."""
+    file = file or sys.stdout
+    rows = sorted(profile_stats().items(), key=lambda item: item[1]["p99_ns"] or 0, reverse=True)
+    print(f"{'function':<30} {'count':>9} {'min':>10} {'p50':>10} {'p95':>10} {'p99':>10} {'max':>10}",
+          file=file)
+    for name, s in rows:
+        if not s["count"]:
+            continue
+        cells = " ".join(f"{s[key] / 1e3:>8.1f}us" for key in ("min_ns", "p50_ns", "p95_ns", "p99_ns", "max_ns"))
+        print(f"{name:<30} {s['count']:>9} {cells}", file=file)
+
+def reset_profile() -> None:
+    for stats in PROFILES.values():
+        stats.reset()
+
+# Function decorator: cached (LRU / LFU / TTL memoization)
+
+_MISSING = object()
+_KWD_MARK = object()
+
+def _make_key(args: tuple, kwargs: dict) -> Hashable:
+    if kwargs:
+        return args + (_KWD_MARK,) + tuple(kwargs.items())
+    return args[0] if len(args) == 1 and type(args[0]) in (int, str) else args
+
+class _LRUStore:
+    """Least recently used entry is evicted first."""
+
+    def __init__(self):
+        self.entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get(self, key):
+        value = self.entries.get(key, _MISSING)
+        if value is not _MISSING:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+
+    def purge(self) -> List[Hashable]:
+        return []
+
+    def evict(self) -> Hashable:
+        return self.entries.popitem(last=False)[0]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+class _TTLStore(_LRUStore):
+    """Entries expire ttl seconds after being stored; oldest is evicted first.
+
+    Every entry lives for the same ttl, so insertion order is also expiry
+    order and expired entries can be purged from the front in O(expired).
+    """
+
+    def __init__(self, ttl: float, clock: Callable[[], float] = time.monotonic):
+        super().__init__()
+        self.ttl = ttl
+        self.clock = clock
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return _MISSING
+        if entry[0] <= self.clock():
+            del self.entries[key]
+            return _MISSING
+        return entry[1]
+
+    def put(self, key, value) -> None:
+        super().put(key, (self.clock() + self.ttl, value))
+
+    def purge(self) -> List[Hashable]:
+        now, expired = self.clock(), []
+        for key, (expires, _) in self.entries.items():
+            if expires > now:
+                break
+            expired.append(key)
+        for key in expired:
+            del self.entries[key]
+        return expired
+
+class _LFUStore:
+    """Least frequently used entry is evicted first (LRU among ties), O(1).
+
+    Keys are grouped into one ordered bucket per use count; min_count points
+    at the bucket to evict from.
+    """
+
+    def __init__(self):
+        self.values: Dict[Hashable, Any] = {}
+        self.counts: Dict[Hashable, int] = {}
+        self.buckets: Dict[int, "OrderedDict[Hashable, None]"] = {}
+        self.min_count = 0
+
+    def _touch(self, key) -> None:
+        count = self.counts[key]
+        bucket = self.buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[count]
+            if self.min_count == count:
+                self.min_count = count + 1
+        self.counts[key] = count + 1
+        self.buckets.setdefault(count + 1, OrderedDict())[key] = None
+
+    def get(self, key):
+        value = self.values.get(key, _MISSING)
+        if value is not _MISSING:
+            self._touch(key)
+        return value
+
+    def put(self, key, value) -> None:
+        if key in self.values:
+            self.values[key] = value
+            self._touch(key)
+            return
+        self.values[key] = value
+        self.counts[key] = 1
+        self.buckets.setdefault(1, OrderedDict())[key] = None
+        self.min_count = 1
+
+    def purge(self) -> List[Hashable]:
+        return []
+
+    def evict(self) -> Hashable:
+        bucket = self.buckets[self.min_count]
+        key = bucket.popitem(last=False)[0]
+        if not bucket:
+            del self.buckets[self.min_count]
+            self.min_count = min(self.buckets, default=0)
+        del self.counts[key]
+        del self.values[key]
+        return key
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    shared: int  # async callers that joined an in-flight computation
+    evictions: int
+    expirations: int
+    currsize: int
+    currbytes: int
+    maxsize: Optional[int]
+    maxbytes: Optional[int]
+
+class Cache:
+    """Bounded mapping with a pluggable eviction policy and hit/miss stats.
+
+    Bounded by entry count (maxsize), by approximate bytes (maxbytes, summed
+    from sizeof(value)), or both; None means unbounded. A value larger than
+    maxbytes on its own is returned but never stored. Room for a new key is
+    made by evicting existing entries before it is inserted, so a fresh entry
+    is never its own victim. clock is the ttl policy's time source.
+    Thread-safe.
+    """
+
+    POLICIES = ("lru", "lfu", "ttl")
+
+    def __init__(self, policy: str = "lru", maxsize: Optional[int] = 128,
+                 maxbytes: Optional[int] = None, ttl: Optional[float] = None,
+                 sizeof: Callable[[Any], int] = sys.getsizeof,
+                 clock: Callable[[], float] = time.monotonic):
+        if policy not in self.POLICIES:
+            raise ValueError(f"policy must be one of {self.POLICIES}, got {policy!r}")
+        if (policy == "ttl") != (ttl is not None):
+            raise ValueError("ttl is required for (and only valid with) the 'ttl' policy")
+        if policy == "ttl":
+            self._store = _TTLStore(ttl, clock)
+        else:
+            self._store = _LFUStore() if policy == "lfu" else _LRUStore()
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self._sizeof = sizeof if maxbytes is not None else None
+        self._sizes: Dict[Hashable, int] = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = self.misses = self.shared = self.evictions = self.expirations = 0
+
+    def get(self, key, default=None):
+        """Cached value for key, or default (counted as a hit or a miss)."""
+        with self._lock:
+            value = self._store.get(key)
+            if value is _MISSING:
+                self.misses += 1
+                if key in self._sizes:  # the ttl store dropped it on lookup
+                    self._bytes -= self._sizes.pop(key)
+                    self.expirations += 1
+                return default
+            self.hits += 1
+            return value
+
+    def _over(self, extra_entries: int, extra_bytes: int) -> bool:
+        return ((self.maxsize is not None and len(self._store) + extra_entries > self.maxsize)
+                or (self.maxbytes is not None and self._bytes + extra_bytes > self.maxbytes))
+
+    def _evict(self) -> None:
+        self._bytes -= self._sizes.pop(self._store.evict())
+        self.evictions += 1
+
+    def put(self, key, value) -> None:
+        size = self._sizeof(value) if self._sizeof else 0
+        if self.maxsize == 0 or (self.maxbytes is not None and size > self.maxbytes):
+            return
+        with self._lock:
+            for expired in self._store.purge():
+                self._bytes -= self._sizes.pop(expired, 0)
+                self.expirations += 1
+            if key not in self._sizes:
+                while len(self._store) and self._over(1, size):
+                    self._evict()
+                self._bytes += size
+                self._sizes[key] = size
+                self._store.put(key, value)
+                return
+            # Replacing a value: only a larger one can need room, and the key
+            # itself stays a candidate (it may be the least valuable entry).
+            self._bytes += size - self._sizes[key]
+            self._sizes[key] = size
+            self._store.put(key, value)
+            while self._over(0, 0):
+                self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            while len(self._store):
+                self._store.evict()
+            self._sizes.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.shared = self.evictions = self.expirations = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.shared, self.evictions, self.expirations,
+                             len(self._store), self._bytes, self.maxsize, self.maxbytes)
+
+def cached(func=None, *, policy: str = "lru", maxsize: Optional[int] = 128,
+           maxbytes: Optional[int] = None, ttl: Optional[float] = None,
+           sizeof: Callable[[Any], int] = sys.getsizeof):
+    """Memoize func in a Cache; usable as @cached or @cached(policy="lfu", ...).
+
+    Arguments must be hashable. The wrapper exposes cache_info(),
+    cache_clear() and the underlying cache. For async functions, concurrent
+    callers with the same key while a call is in flight await that one task
+    (shielded, so one caller being cancelled does not cancel the others);
+    only successful results are cached. Sync functions are not de-duplicated:
+    two threads missing at once both compute.
+    """
+    def decorate(func):
+        cache = Cache(policy, maxsize, maxbytes, ttl, sizeof)
+
+        if inspect.iscoroutinefunction(func):
+            inflight: Dict[Hashable, asyncio.Future] = {}
+
+            def settle(key, task: asyncio.Future) -> None:
+                inflight.pop(key, None)
+                if not task.cancelled() and task.exception() is None:
+                    cache.put(key, task.result())
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = _make_key(args, kwargs)
+                value = cache.get(key, _MISSING)
+                if value is not _MISSING:
+                    return value
+                task = inflight.get(key)
+                if task is None:
+                    task = inflight[key] = asyncio.ensure_future(func(*args, **kwargs))
+                    task.add_done_callback(lambda t, key=key: settle(key, t))
+                else:
+                    cache.shared += 1
+                return await asyncio.shield(task)
+            wrapper = async_wrapper
+        else:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                key = _make_key(args, kwargs)
+                value = cache.get(key, _MISSING)
+                if value is _MISSING:
+                    value = func(*args, **kwargs)
+                    cache.put(key, value)
+                return value
+
+        wrapper.cache = cache
+        wrapper.cache_info = cache.info
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
 # Class decorator: log_init
 
 def log_init(cls):
+    """Print a line per instance; for hot classes use trace_init instead."""
     orig_init = cls.__init__
+    @wraps(orig_init)
     def __init__(self, *args, **kwargs):
         print(f"[log_init] Creating instance of {cls.__name__}")
         orig_init(self, *args, **kwargs)
     cls.__init__ = __init__
     return cls
 
+# Class decorator: trace_init (switchable instantiation counters)
+
+class InitTracer:
+    """Counts constructions per traced class, with a true off switch.
+
+    Counters are one slot per class in an array('Q'). enable() installs a
+    counting __init__ wrapper on every traced class; disable() puts the
+    original __init__ back, so the off mode costs nothing per instance.
+    Subclasses that inherit a traced __init__ count towards the traced class.
+    Under heavy threading an increment can occasionally be lost; the counts
+    are meant for summaries, not accounting.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._classes: List[type] = []
+        self._original: List[Optional[Callable]] = []  # None: __init__ was inherited
+        self._counts = array("Q")
+        self._reporter: Optional[threading.Event] = None
+
+    def trace(self, cls):
+        slot = len(self._classes)
+        self._classes.append(cls)
+        self._original.append(cls.__dict__.get("__init__"))
+        self._counts.append(0)
+        if self.enabled:
+            self._install(slot)
+        return cls
+
+    def _install(self, slot: int) -> None:
+        cls, counts = self._classes[slot], self._counts
+        orig_init = cls.__init__
+        @wraps(orig_init)
+        def __init__(self, *args, **kwargs):
+            counts[slot] += 1
+            orig_init(self, *args, **kwargs)
+        cls.__init__ = __init__
+
+    def _uninstall(self, slot: int) -> None:
+        cls, original = self._classes[slot], self._original[slot]
+        if original is None:
+            del cls.__init__
+        else:
+            cls.__init__ = original
+
+    def enable(self) -> None:
+        if not self.enabled:
+            self.enabled = True
+            for slot in range(len(self._classes)):
+                self._install(slot)
+
+    def disable(self) -> None:
+        if self.enabled:
+            self.enabled = False
+            for slot in range(len(self._classes)):
+                self._uninstall(slot)
+
+    def counts(self) -> Dict[str, int]:
+        return {cls.__qualname__: n for cls, n in zip(self._classes, self._counts)}
+
+    def reset(self) -> None:
+        for slot in range(len(self._counts)):
+            self._counts[slot] = 0
+
+    def summary(self, file=None) -> None:
+        """Print non-zero counts, most constructed first."""
+        file = file or sys.stdout
+        rows = sorted(((n, name) for name, n in self.counts().items() if n), reverse=True)
+        print("[trace_init] " + (", ".join(f"{name}={n}" for n, name in rows) or "no instances"), file=file)
+
+    def start_reporting(self, interval: float = 60.0, file=None) -> None:
+        """Print summary() every interval seconds from a daemon thread."""
+        self.stop_reporting()
+        stop = self._reporter = threading.Event()
+        def report():
+            while not stop.wait(interval):
+                self.summary(file)
+        threading.Thread(target=report, name="trace_init-reporter", daemon=True).start()
+
+    def stop_reporting(self) -> None:
+        if self._reporter is not None:
+            self._reporter.set()
+            self._reporter = None
+
+tracer = InitTracer()
+trace_init = tracer.trace
+
+def benchmark_init_tracing(n: int = 1_000_000) -> None:
+    """Construction cost: plain class vs trace_init (on and off) vs log_init."""
+    class Plain:
+        def __init__(self, x):
+            self.x = x
+
+    local = InitTracer()
+    @local.trace
+    class Traced:
+        def __init__(self, x):
+            self.x = x
+
+    @log_init
+    class Logged:
+        def __init__(self, x):
+            self.x = x
+
+    def per_call(cls, number: int) -> float:
+        return min(timeit.repeat(lambda: cls(1), number=number, repeat=3)) / number * 1e9
+
+    print(f"{'plain':<16} {per_call(Plain, n):>7.1f} ns")
+    print(f"{'trace_init on':<16} {per_call(Traced, n):>7.1f} ns")
+    local.disable()
+    print(f"{'trace_init off':<16} {per_call(Traced, n):>7.1f} ns")
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            logged = per_call(Logged, n // 10)
+        finally:
+            sys.stdout = stdout
+    print(f"{'log_init':<16} {logged:>7.1f} ns  (print to /dev/null)")
+
 # Example usage
 if __name__ == "__main__":
     @benchmark
@@ -37,3 +626,49 @@ if __name__ == "__main__":
 
     slow_add(2, 3)
     u = User("Alice")
+
+    @profile
+    def fast_add(a, b):
+        return a + b
+
+    @profile(sample_rate=0.1)
+    async def async_add(a, b):
+        await asyncio.sleep(0)
+        return a + b
+
+    async def main():
+        for i in range(1000):
+            await async_add(i, i)
+
+    for i in range(100_000):
+        fast_add(i, i)
+    asyncio.run(main())
+    dump_profile()
+
+    @cached(policy="lfu", maxsize=2)
+    def square(n):
+        return n * n
+
+    for n in (1, 1, 2, 3, 1, 4):
+        square(n)
+    print(square.cache_info())
+
+    @cached(policy="ttl", ttl=60, maxbytes=1 << 20)
+    async def fetch_user(user_id):
+        await asyncio.sleep(0.01)
+        return {"id": user_id}
+
+    async def fetch_all():
+        await asyncio.gather(*(fetch_user(i % 10) for i in range(1000)))
+
+    asyncio.run(fetch_all())
+    print(fetch_user.cache_info())
+
+    @trace_init
+    class Order:
+        def __init__(self, order_id):
+            self.order_id = order_id
+
+    orders = [Order(i) for i in range(10_000)]
+    tracer.summary()
+    benchmark_init_tracing()
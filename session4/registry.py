@@ -1,17 +1,197 @@
 # registry.py
 
+import importlib
+import json
+import logging
+import os
+import sys
+from typing import Dict, Iterator, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
 class_registry = {}
 
+class LazyRegistry(Mapping):
+    """Maps names to "module:qualname" entries; imports a class on first lookup.
+
+    Entries usually come from a manifest precomputed by build_manifest(), so
+    listing or checking names never imports anything. Resolved classes are
+    cached. No registry lock is held while importing: importlib already runs
+    each module once under its own per-module lock, and a module that looks
+    up another service at import time would deadlock on a shared lock.
+    """
+
+    def __init__(self, entries: Optional[Mapping[str, str]] = None):
+        self._entries: Dict[str, str] = {}
+        self._loaded: Dict[str, type] = {}
+        for name, target in (entries or {}).items():
+            self.register(name, target)
+
+    def register(self, name: str, target: str, cls: Optional[type] = None) -> None:
+        """Add name -> "module:qualname"; pass cls if it is already imported."""
+        module, sep, qualname = target.partition(":")
+        if not (module and sep and qualname):
+            raise ValueError(f"entry for {name!r} must look like 'module:qualname', got {target!r}")
+        self._entries[name] = target
+        if cls is not None:
+            self._loaded[name] = cls
+        else:
+            self._loaded.pop(name, None)
+
+    def target(self, name: str) -> str:
+        return self._entries[name]
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    def __getitem__(self, name: str) -> type:
+        try:
+            return self._loaded[name]
+        except KeyError:
+            pass
+        target = self._entries[name]  # KeyError for unknown names
+        module_name, _, qualname = target.partition(":")
+        obj = importlib.import_module(module_name)
+        for attr in qualname.split("."):
+            obj = getattr(obj, attr)
+        # Threads racing here got the same module object, so keep whichever
+        # result landed first.
+        return self._loaded.setdefault(name, obj)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, name) -> bool:
+        return name in self._entries
+
+    @classmethod
+    def from_manifest(cls, path: str) -> "LazyRegistry":
+        return cls(load_manifest(path))
+
+lazy_registry = LazyRegistry()
+
 class AutoRegister(type):
     def __new__(mcs, name, bases, attrs):
         cls = super().__new__(mcs, name, bases, attrs)
         if name != "BaseService":
             class_registry[name] = cls
-            print(f"[AutoRegister] Registered {name}")
+            lazy_registry.register(name, f"{cls.__module__}:{cls.__qualname__}", cls)
+            logger.debug("[AutoRegister] Registered %s", name)
         return cls
 
+# Manifest: discovered from source with ast, so building it imports nothing
+
+def _module_name(path: str, root: str) -> str:
+    rel = os.path.splitext(os.path.relpath(path, root))[0]
+    parts = rel.split(os.sep)
+    if parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+def build_manifest(root: str, base: str = "BaseService") -> Dict[str, str]:
+    """Scan the .py files under root (an import root) for subclasses of base.
+
+    Matches module-level classes whose bases name base, a class found to
+    derive from it anywhere under root (so a subclass of a subclass imported
+    from another module counts), or that use metaclass=AutoRegister. Bases
+    are matched by bare name, and derived names are resolved by repeating
+    the pass until no new class is found. Returns {name: "module:qualname"}.
+    """
+    import ast  # build-time only: keep it off the lookup path's import cost
+
+    classes = []  # (module, name, base names, uses AutoRegister)
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith((".", "__pycache__")))
+        for filename in sorted(filenames):
+            if not filename.endswith(".py"):
+                continue
+            path = os.path.join(dirpath, filename)
+            with open(path, "rb") as f:
+                try:
+                    tree = ast.parse(f.read(), path)
+                except SyntaxError:
+                    logger.warning("skipping %s: syntax error", path)
+                    continue
+            module = _module_name(path, root)
+            for node in tree.body:
+                if not isinstance(node, ast.ClassDef):
+                    continue
+                base_names = {b.attr if isinstance(b, ast.Attribute) else getattr(b, "id", None)
+                              for b in node.bases}
+                uses_meta = any(k.arg == "metaclass" and getattr(k.value, "id", None) == "AutoRegister"
+                                for k in node.keywords)
+                classes.append((module, node.name, base_names, uses_meta))
+
+    derived = {base}
+    found: Dict[str, str] = {}
+    while True:
+        new = {name: f"{module}:{name}" for module, name, base_names, uses_meta in classes
+               if name not in found and (base_names & derived or uses_meta)}
+        if not new:
+            break
+        found.update(new)
+        derived.update(new)
+    found.pop(base, None)
+    return found
+
+def write_manifest(manifest: Mapping[str, str], path: str) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(dict(sorted(manifest.items())), f, indent=2)
+    os.replace(tmp, path)
+
+def load_manifest(path: str) -> Dict[str, str]:
+    with open(path) as f:
+        return json.load(f)
+
+def benchmark_cold_start(n_services: int = 200, payload_lines: int = 300) -> None:
+    """Fresh-interpreter time to get one service: import everything vs lazy lookup."""
+    import subprocess
+    import tempfile
+    import time
+
+    with tempfile.TemporaryDirectory() as root:
+        pkg = os.path.join(root, "services")
+        os.mkdir(pkg)
+        open(os.path.join(pkg, "__init__.py"), "w").close()
+        with open(os.path.join(pkg, "base.py"), "w") as f:
+            f.write("class BaseService:\n    pass\n")
+        body = "".join(f"    def method_{j}(self, x):\n        return x + {j}\n" for j in range(payload_lines))
+        for i in range(n_services):
+            with open(os.path.join(pkg, f"service_{i}.py"), "w") as f:
+                f.write(f"from services.base import BaseService\n\nclass Service{i}(BaseService):\n{body}")
+        start = time.perf_counter()
+        manifest = build_manifest(root)
+        build_s = time.perf_counter() - start
+        manifest_path = os.path.join(root, "manifest.json")
+        write_manifest(manifest, manifest_path)
+
+        here = os.path.dirname(os.path.abspath(__file__))
+        scripts = {
+            "eager": (f"import importlib\n"
+                      f"mods = [importlib.import_module(f'services.service_{{i}}') for i in range({n_services})]\n"
+                      f"cls = mods[0].Service0\n"),
+            "lazy": (f"import sys; sys.path.insert(0, {here!r})\n"
+                     f"from registry import LazyRegistry\n"
+                     f"cls = LazyRegistry.from_manifest({manifest_path!r})['Service0']\n"),
+        }
+        print(f"manifest: {len(manifest)} services discovered in {build_s:.3f}s")
+        for label, script in scripts.items():
+            best = float("inf")
+            for _ in range(3):
+                # -B: do not write .pyc, so every run pays the full compile
+                start = time.perf_counter()
+                subprocess.run([sys.executable, "-B", "-c", script], cwd=root, check=True)
+                best = min(best, time.perf_counter() - start)
+            print(f"{label:<6} {best:.3f}s")
+
 # Example usage
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+
     class BaseService(metaclass=AutoRegister):
         pass
 
@@ -22,3 +202,9 @@ if __name__ == "__main__":
         pass
 
     print(class_registry)  # {'UserService': ..., 'OrderService': ...}
+
+    registry = LazyRegistry({"Fraction": "fractions:Fraction"})
+    print("fractions" in sys.modules and "already imported" or "not imported yet")
+    print(registry["Fraction"], registry.is_loaded("Fraction"))
+
+    benchmark_cold_start()
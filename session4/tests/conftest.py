@@ -0,0 +1,21 @@
+"""
+Test configuration and fixtures.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def clock():
+    """A manual clock: call it for the time, advance it with clock.now += seconds."""
+    class ManualClock:
+        now = 0.0
+
+        def __call__(self):
+            return self.now
+
+    return ManualClock()
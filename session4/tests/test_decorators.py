@@ -0,0 +1,139 @@
+"""
+Unit tests for the caching decorators.
+"""
+import asyncio
+
+import pytest
+
+from decorators import Cache, cached
+
+
+class TestCacheEviction:
+    """Which entry each policy gives up when the cache is full."""
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = Cache("lru", maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+    def test_lfu_evicts_least_frequently_used(self):
+        cache = Cache("lfu", maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+    def test_lfu_keeps_admitting_new_keys(self):
+        """A fresh key evicts an old one instead of being evicted itself."""
+        cache = Cache("lfu", maxsize=1)
+        cache.put("a", 1)
+        cache.get("a")
+        cache.put("b", 2)
+        assert cache.get("b") == 2
+        assert cache.get("a") is None
+
+    def test_lfu_decorator_hits_after_warm_up(self):
+        calls = []
+
+        @cached(policy="lfu", maxsize=2)
+        def ident(x):
+            calls.append(x)
+            return x
+
+        for x in (1, 1, 2, 2, 3, 3, 3, 3):
+            ident(x)
+        assert calls == [1, 2, 3]
+        info = ident.cache_info()
+        assert (info.hits, info.misses, info.evictions) == (5, 3, 1)
+
+    def test_ttl_expires_and_evicts_oldest(self, clock):
+        cache = Cache("ttl", ttl=10, maxsize=2, clock=clock)
+        cache.put("a", 1)
+        clock.now = 1
+        cache.put("b", 2)
+        clock.now = 2
+        cache.put("c", 3)  # full: the oldest entry goes
+        assert cache.get("a") is None
+        clock.now = 11.5  # b expired at 11, c lives until 12
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+        assert cache.info().expirations == 1
+
+    def test_get_returns_default_on_miss(self):
+        cache = Cache("lru")
+        sentinel = object()
+        assert cache.get("missing", sentinel) is sentinel
+        cache.put("none", None)
+        assert cache.get("none", sentinel) is None
+
+
+class TestCacheByteBound:
+    """maxbytes bounds the summed sizeof() of the stored values."""
+
+    def test_evicts_until_under_budget(self):
+        cache = Cache("lru", maxsize=None, maxbytes=100, sizeof=len)
+        cache.put("a", "x" * 40)
+        cache.put("b", "x" * 40)
+        cache.put("c", "x" * 40)
+        info = cache.info()
+        assert (info.currsize, info.currbytes, info.evictions) == (2, 80, 1)
+        assert cache.get("a") is None
+
+    def test_oversized_value_is_not_stored(self):
+        cache = Cache("lru", maxsize=None, maxbytes=100, sizeof=len)
+        cache.put("a", "x" * 10)
+        cache.put("big", "x" * 101)
+        assert cache.get("big") is None
+        assert cache.get("a") == "x" * 10
+
+    def test_growing_a_value_makes_room(self):
+        cache = Cache("lru", maxsize=None, maxbytes=100, sizeof=len)
+        cache.put("a", "x" * 40)
+        cache.put("b", "x" * 40)
+        cache.put("b", "x" * 70)
+        assert cache.get("a") is None
+        assert cache.info().currbytes == 70
+
+
+class TestAsyncCached:
+    """Concurrent awaits of one key share a single computation."""
+
+    def test_in_flight_calls_are_deduplicated(self):
+        calls = []
+
+        @cached
+        async def load(key):
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return key * 2
+
+        async def main():
+            return await asyncio.gather(*(load(i % 3) for i in range(30)))
+
+        assert asyncio.run(main()) == [(i % 3) * 2 for i in range(30)]
+        assert sorted(calls) == [0, 1, 2]
+        assert load.cache_info().shared == 27
+
+    def test_failures_are_shared_but_not_cached(self):
+        calls = []
+
+        @cached
+        async def boom(key):
+            calls.append(key)
+            await asyncio.sleep(0)
+            raise ValueError(key)
+
+        async def main():
+            return await asyncio.gather(*(boom(1) for _ in range(5)), return_exceptions=True)
+
+        assert all(isinstance(r, ValueError) for r in asyncio.run(main()))
+        assert calls == [1]
+        with pytest.raises(ValueError):
+            asyncio.run(boom(1))
+        assert calls == [1, 1]
@@ -0,0 +1,81 @@
+"""
+Unit tests for the lazy service registry and its manifest.
+"""
+import sys
+import threading
+
+import pytest
+
+import registry
+from registry import LazyRegistry, build_manifest
+
+
+@pytest.fixture
+def services(tmp_path, monkeypatch):
+    """Write modules {name: source} under an import root on sys.path and return the root."""
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    def write(modules):
+        for name, source in modules.items():
+            path = tmp_path.joinpath(*name.split("."))
+            path.parent.mkdir(parents=True, exist_ok=True)
+            for parent in path.relative_to(tmp_path).parents:
+                if parent.name:
+                    (tmp_path / parent / "__init__.py").touch()
+            path.with_suffix(".py").write_text(source)
+        return str(tmp_path)
+
+    yield write
+    # Forget the generated modules so the next test can reuse their names.
+    for name in [name for name in sys.modules if name.startswith("svc")]:
+        del sys.modules[name]
+
+
+class TestLazyRegistry:
+    """Looking services up imports them on demand."""
+
+    def test_lookup_during_import_does_not_deadlock(self, services, monkeypatch):
+        """A service module may resolve another service while it is being imported."""
+        services({
+            "svc_a": "from registry import lazy_registry\nB = lazy_registry['B']\nclass A:\n    pass\n",
+            "svc_b": "class B:\n    pass\n",
+        })
+        monkeypatch.setattr(registry, "lazy_registry", LazyRegistry({"A": "svc_a:A", "B": "svc_b:B"}))
+        found = []
+        thread = threading.Thread(target=lambda: found.append(registry.lazy_registry["A"]), daemon=True)
+        thread.start()
+        thread.join(timeout=10)
+        assert not thread.is_alive(), "lookup deadlocked"
+        assert found[0].__name__ == "A" and registry.lazy_registry.is_loaded("B")
+
+    def test_concurrent_lookups_import_once(self, services):
+        services({"svc_slow": "import time\ntime.sleep(0.2)\nclass Slow:\n    pass\n"})
+        lazy = LazyRegistry({"Slow": "svc_slow:Slow"})
+        found = []
+        threads = [threading.Thread(target=lambda: found.append(lazy["Slow"])) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(found) == 4 and all(cls is sys.modules["svc_slow"].Slow for cls in found)
+
+
+class TestBuildManifest:
+    """Services are discovered from source without importing it."""
+
+    def test_subclass_chains_span_modules(self, services):
+        root = services({
+            "svc.base": "class BaseService:\n    pass\n",
+            "svc.users": "from svc.base import BaseService\nclass UserService(BaseService):\n    pass\n",
+            "svc.billing.premium": ("from svc.users import UserService\n"
+                                    "class Premium(UserService):\n    pass\n"
+                                    "class Helper:\n    pass\n"),
+            "svc.a_gold": "from svc.billing import premium\nclass Gold(premium.Premium):\n    pass\n",
+        })
+        manifest = build_manifest(root)
+        assert manifest == {
+            "UserService": "svc.users:UserService",
+            "Premium": "svc.billing.premium:Premium",
+            "Gold": "svc.a_gold:Gold",
+        }
+        assert LazyRegistry(manifest)["Gold"].__mro__[1].__name__ == "Premium"
@@ -1,8 +1,25 @@
 import asyncio
 import aiohttp
+import contextlib
+import hashlib
+import inspect
+import heapq
+import math
+import os
+import random
+import re
+import sys
+import tempfile
 import time
+import tracemalloc
 import requests
+from aiohttp import web
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import (AsyncIterator, Awaitable, Callable, Deque, Dict, Iterable, Iterator, List,
+                    Optional, Tuple, Union)
+from urllib.parse import urljoin, urlsplit, urlunsplit
 
 
 URLS = [
@@ -22,35 +39,676 @@ URLS = [
 def print_title(title):
     print(f"Fetched: {title}")
 
-async def fetch(session, url):
+CHUNK_SIZE = 64 * 1024
+
+# Called with (url, chunk) for every chunk as it arrives; may be sync or async.
+Sink = Callable[[str, bytes], Union[None, Awaitable[None]]]
+
+class ResponseTooLarge(Exception):
+    """The response body is longer than the max_bytes limit."""
+
+async def iter_body(resp: aiohttp.ClientResponse, chunk_size: int = CHUNK_SIZE,
+                    max_bytes: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Yield resp's body in chunks of up to chunk_size bytes.
+
+    Raises ResponseTooLarge as soon as the body is known to exceed max_bytes:
+    up front from Content-Length, or while reading when it is absent or wrong.
+    """
+    if max_bytes is not None and (resp.content_length or 0) > max_bytes:
+        raise ResponseTooLarge(f"{resp.url}: Content-Length {resp.content_length} > {max_bytes}")
+    size = 0
+    async for chunk in resp.content.iter_chunked(chunk_size):
+        size += len(chunk)
+        if max_bytes is not None and size > max_bytes:
+            raise ResponseTooLarge(f"{resp.url}: body exceeds {max_bytes} bytes")
+        yield chunk
+
+def decode_body(resp: aiohttp.ClientResponse, body: bytes) -> str:
+    return body.decode(resp.charset or "utf-8", errors="replace")
+
+async def fetch(session, url, max_bytes=None, sink: Optional[Sink] = None):
     """Fetch a URL and print its title.
      Args:
          session: aiohttp ClientSession
          url: URL to fetch
+         max_bytes: raise ResponseTooLarge for longer bodies
+         sink: if given, receives (url, chunk) for each chunk as it arrives
+               and nothing is buffered
      Returns:
-         The response text
+         The response text, or the body size in bytes when streaming to sink
     """
     async with session.get(url) as resp:
-        text = await resp.text()
+        if sink is None:
+            body = bytearray()
+            async for chunk in iter_body(resp, max_bytes=max_bytes):
+                body += chunk
+            print_title(url)
+            return decode_body(resp, body)
+        size = 0
+        async for chunk in iter_body(resp, max_bytes=max_bytes):
+            size += len(chunk)
+            if inspect.isawaitable(pending := sink(url, chunk)):
+                await pending
         print_title(url)
-        return text
+        return size
+
+async def async_crawler(urls=URLS, **options):
+    """Fetch urls through a Crawler; returns bodies in url order (None on failure)."""
+    bodies = {}
+    async for result in Crawler(**options).crawl(urls):
+        if result.ok:
+            print_title(result.url)
+        bodies[result.url] = result.body
+    return [bodies.get(url) for url in urls]
+
+# Crawler engine: bounded workers, pooled connections, rate limit, retries
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+@dataclass
+class FetchResult:
+    url: str
+    status: Optional[int] = None
+    body: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    elapsed: float = 0.0
+    size: int = 0  # body bytes received
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.status is not None and self.status < 400
+
+class TokenBucket:
+    """Allows rate requests per second on average, with bursts of up to burst."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        # The lock makes waiters queue in FIFO order instead of all waking at once.
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def make_connector(limit: int = 100, limit_per_host: int = 8,
+                   keepalive_timeout: float = 30.0, dns_cache_ttl: int = 300) -> aiohttp.TCPConnector:
+    """Pooled connector: caps total and per-host sockets, keeps them alive, caches DNS."""
+    return aiohttp.TCPConnector(limit=limit, limit_per_host=limit_per_host,
+                                keepalive_timeout=keepalive_timeout,
+                                use_dns_cache=True, ttl_dns_cache=dns_cache_ttl)
+
+class Crawler:
+    """Crawl a stream of URLs with a fixed worker pool, yielding results as they finish.
+
+    Args:
+        concurrency: number of worker tasks (and so of requests in flight).
+        limit_per_host: connector cap on sockets open to one host.
+        rate: requests per second across all workers (None: unlimited).
+        burst: token bucket size; defaults to rate.
+        retries: extra attempts after connection errors, timeouts and
+            RETRY_STATUSES responses.
+        backoff: base delay for full-jitter exponential backoff, capped at
+            max_backoff; a numeric Retry-After header takes precedence.
+        timeout: per-request aiohttp.ClientTimeout.
+        headers: default request headers.
+        max_bytes: bodies longer than this fail with a ResponseTooLarge
+            error (None: no limit).
+        chunk_size: read size for response bodies.
+        sink: if given, gets (url, chunk) for every chunk as it arrives and
+            results carry no body, so memory stays flat however large the
+            pages or the crawl. A response is not retried once a chunk of it
+            has reached the sink.
+    """
+
+    def __init__(self, concurrency: int = 20, limit_per_host: int = 8,
+                 rate: Optional[float] = None, burst: Optional[int] = None,
+                 retries: int = 3, backoff: float = 0.5, max_backoff: float = 30.0,
+                 timeout: Optional[aiohttp.ClientTimeout] = None,
+                 headers: Optional[Dict[str, str]] = None,
+                 max_bytes: Optional[int] = 10 * 2**20, chunk_size: int = CHUNK_SIZE,
+                 sink: Optional[Sink] = None):
+        self.concurrency = concurrency
+        self.limit_per_host = limit_per_host
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout or aiohttp.ClientTimeout(total=30, connect=10, sock_read=20)
+        self.headers = headers
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.sink = sink
+
+    async def _read(self, resp: aiohttp.ClientResponse, result: FetchResult) -> None:
+        body = bytearray() if self.sink is None else None
+        async for chunk in iter_body(resp, self.chunk_size, self.max_bytes):
+            result.size += len(chunk)
+            if body is not None:
+                body += chunk
+            elif inspect.isawaitable(pending := self.sink(result.url, chunk)):
+                await pending
+        if body is not None:
+            result.body = decode_body(resp, body)
+
+    def _delay(self, attempt: int, resp: Optional[aiohttp.ClientResponse] = None) -> float:
+        retry_after = resp.headers.get("Retry-After", "") if resp is not None else ""
+        if retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
 
-async def async_crawler():
-    async with aiohttp.ClientSession() as session:
-        tasks = [fetch(session, url) for url in URLS]
-        return await asyncio.gather(*tasks)
+    async def fetch(self, session: aiohttp.ClientSession, url: str,
+                    bucket: Optional[TokenBucket] = None) -> FetchResult:
+        """GET url with retries; never raises for HTTP or network errors."""
+        result = FetchResult(url)
+        start = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            if bucket is not None:
+                await bucket.acquire()
+            result.attempts = attempt + 1
+            try:
+                async with session.get(url) as resp:
+                    result.status, result.error = resp.status, None
+                    if resp.status not in RETRY_STATUSES or attempt == self.retries:
+                        result.size = 0
+                        await self._read(resp, result)
+                        break
+                    delay = self._delay(attempt, resp)
+                # Back off only after the response is released: held open, it
+                # would keep its connection and a limit_per_host slot.
+                await asyncio.sleep(delay)
+            except ResponseTooLarge as exc:
+                result.error = f"ResponseTooLarge: {exc}"
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                result.error = f"{type(exc).__name__}: {exc}"
+                if self.sink is not None and result.size:
+                    break  # the sink already has part of this body
+                if attempt < self.retries:
+                    await asyncio.sleep(self._delay(attempt))
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    async def crawl(self, urls: Iterable[str]) -> AsyncIterator[FetchResult]:
+        """Yield a FetchResult per url in completion order.
+
+        urls is consumed lazily through a bounded queue, so it can be a
+        generator over millions of URLs. Breaking out of the loop cancels
+        the remaining work. If iterating urls raises, the workers are
+        cancelled and the error is re-raised here.
+        """
+        todo: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        async def produce(session, done, bucket):
+            for url in urls:
+                await todo.put(url)
+            for _ in range(self.concurrency):
+                await todo.put(None)
+
+        async def work(session, done, bucket):
+            while (url := await todo.get()) is not None:
+                await done.put(await self.fetch(session, url, bucket))
+
+        async for result in self._run(work, produce):
+            yield result
+
+    async def crawl_frontier(self, frontier: "Frontier", max_pages: Optional[int] = None,
+                             follow: bool = True) -> AsyncIterator[FetchResult]:
+        """Crawl until frontier is exhausted (or max_pages fetched), yielding results.
+
+        With follow, links extracted from each successful page are added back
+        to the frontier, which drops those it has already seen (this needs the
+        body, so it does nothing when the crawler streams to a sink).
+        """
+        started = 0
+
+        async def work(session, done, bucket):
+            nonlocal started
+            while max_pages is None or started < max_pages:
+                url = await frontier.get()
+                if url is None:
+                    break
+                started += 1
+                try:
+                    result = await self.fetch(session, url, bucket)
+                    if follow and result.ok and result.body:
+                        for link in extract_links(url, result.body):
+                            frontier.add(link)
+                finally:
+                    frontier.task_done()
+                await done.put(result)
+
+        async for result in self._run(work):
+            yield result
+
+    async def _run(self, work, produce=None) -> AsyncIterator[FetchResult]:
+        """Run concurrency copies of work (plus produce) and yield what they put in done."""
+        done: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        bucket = TokenBucket(self.rate, self.burst) if self.rate else None
+        connector = make_connector(limit=self.concurrency, limit_per_host=self.limit_per_host)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=self.timeout,
+                                         headers=self.headers) as session:
+            async def worker():
+                try:
+                    await work(session, done, bucket)
+                finally:
+                    await done.put(None)
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            tasks = list(workers)
+            producer = None
+            if produce is not None:
+                producer = asyncio.create_task(produce(session, done, bucket))
+                tasks.append(producer)
+
+                def stop_if_failed(task: asyncio.Task) -> None:
+                    # Without the producer's sentinels the workers would wait
+                    # on the queue forever.
+                    if not task.cancelled() and task.exception() is not None:
+                        for worker_task in workers:
+                            worker_task.cancel()
+
+                producer.add_done_callback(stop_if_failed)
+            try:
+                finished = 0
+                while finished < self.concurrency:
+                    result = await done.get()
+                    if result is None:
+                        finished += 1
+                    else:
+                        yield result
+                if producer is not None:
+                    await producer  # re-raises what stopped the workers, if anything
+                await asyncio.gather(*workers)  # surface errors from work
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+# Crawl frontier: URL dedup, per-host politeness, on-disk spill
+
+_HREF = re.compile(r"""href\s*=\s*["']([^"'#\s]+)""", re.IGNORECASE)
+_DEFAULT_PORTS = {"http": ":80", "https": ":443"}
+
+def canonicalize(url: str) -> Optional[str]:
+    """Normalized http(s) URL (lowercase scheme/host, no default port or fragment), else None."""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.netloc:
+        return None
+    netloc = parts.netloc.lower()
+    if netloc.endswith(_DEFAULT_PORTS[scheme]):
+        netloc = netloc[: -len(_DEFAULT_PORTS[scheme])]
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+def extract_links(base_url: str, html: str) -> Iterator[str]:
+    """Absolute URLs of the href attributes in html (not yet canonicalized)."""
+    for match in _HREF.finditer(html):
+        yield urljoin(base_url, match.group(1))
+
+class BloomFilter:
+    """Probabilistic seen-set: about 1.8 bytes per URL at a 0.1% false-positive rate.
+
+    A false positive means a URL is wrongly treated as already seen and
+    skipped; there are no false negatives. Positions come from one blake2b
+    digest split into two 64-bit halves (double hashing).
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "little")
+        b = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return ((a + i * b) % size for i in range(self.hashes))
+
+    def add(self, item: str) -> bool:
+        """Set item's bits; True if it was not (probably) present before."""
+        bits, new = self.bits, False
+        for pos in self._positions(item):
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                bits[pos >> 3] |= mask
+                new = True
+        self.count += new
+        return new
+
+    def __contains__(self, item: str) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.count
+
+class Frontier:
+    """URLs waiting to be crawled: deduplicated, polite per host, spillable to disk.
+
+    Each host has its own FIFO queue, and a heap orders hosts by the time they
+    may next be fetched from (delay seconds after the previous hand-out), so a
+    single host cannot monopolise the workers. URLs are canonicalized and run
+    through seen (a BloomFilter by default) before being queued. Once
+    max_in_memory URLs are queued, new ones are appended to a spill file in
+    spill_dir and read back in order as the in-memory queues drain.
+    """
+
+    def __init__(self, delay: float = 1.0, seen=None, capacity: int = 1_000_000,
+                 max_in_memory: int = 100_000, spill_dir: Optional[str] = None):
+        self.delay = delay
+        self.seen = seen if seen is not None else BloomFilter(capacity)
+        self.max_in_memory = max_in_memory
+        self.spill_dir = spill_dir
+        self.queues: Dict[str, Deque[str]] = {}
+        self.ready: List[Tuple[float, str]] = []  # (not before, host) for hosts with a queue
+        self.next_allowed: Dict[str, float] = {}
+        self.in_memory = 0
+        self.spilled = 0
+        self.pending = 0  # handed out by get(), task_done() not called yet
+        self._spill_writer = None
+        self._spill_reader = None
+        # Created on first get(), inside the running loop: on Python < 3.10 an
+        # Event binds to the loop current at construction, which is not the
+        # one asyncio.run() later starts.
+        self._wakeup: Optional[asyncio.Event] = None
+        self._wakeup_loop = None
+
+    def add(self, url: str) -> bool:
+        """Queue url unless it is not http(s) or was seen before; True if queued."""
+        url = canonicalize(url)
+        if url is None or not self.seen.add(url):
+            return False
+        if self.in_memory >= self.max_in_memory and self.spill_dir is not None:
+            self._spill(url)
+        else:
+            self._enqueue(url)
+        self._wake()
+        return True
+
+    def _wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _event(self) -> asyncio.Event:
+        loop = asyncio.get_running_loop()
+        if self._wakeup_loop is not loop:
+            self._wakeup, self._wakeup_loop = asyncio.Event(), loop
+        return self._wakeup
+
+    def _enqueue(self, url: str) -> None:
+        host = urlsplit(url).netloc
+        queue = self.queues.get(host)
+        if queue is None:
+            queue = self.queues[host] = deque()
+            heapq.heappush(self.ready, (self.next_allowed.get(host, 0.0), host))
+        queue.append(url)
+        self.in_memory += 1
+
+    def _spill(self, url: str) -> None:
+        if self._spill_writer is None:
+            fd, path = tempfile.mkstemp(prefix="frontier-", suffix=".txt", dir=self.spill_dir)
+            self._spill_writer = os.fdopen(fd, "w")
+            self._spill_reader = open(path)
+            os.unlink(path)  # both handles keep the file alive; nothing to clean up
+        self._spill_writer.write(url + "\n")
+        self.spilled += 1
+
+    def _refill(self) -> None:
+        if not self.spilled or self.in_memory > self.max_in_memory // 2:
+            return
+        self._spill_writer.flush()
+        while self.spilled and self.in_memory < self.max_in_memory:
+            self._enqueue(self._spill_reader.readline().rstrip("\n"))
+            self.spilled -= 1
+        if not self.spilled:
+            self._spill_writer.close()
+            self._spill_reader.close()
+            self._spill_writer = self._spill_reader = None
+
+    def next_url(self) -> Optional[str]:
+        """A URL whose host may be fetched now, or None (without waiting)."""
+        self._refill()
+        if not self.ready:
+            return None
+        now = time.monotonic()
+        not_before, host = self.ready[0]
+        if not_before > now:
+            return None
+        heapq.heappop(self.ready)
+        queue = self.queues[host]
+        url = queue.popleft()
+        self.in_memory -= 1
+        self.next_allowed[host] = now + self.delay
+        if queue:
+            heapq.heappush(self.ready, (now + self.delay, host))
+        else:
+            del self.queues[host]
+        self.pending += 1
+        return url
+
+    async def get(self) -> Optional[str]:
+        """Wait for the next URL; None once nothing is queued or in flight."""
+        wakeup = self._event()
+        while True:
+            url = self.next_url()
+            if url is not None:
+                return url
+            if not self.ready and not self.pending and not self.spilled:
+                wakeup.set()  # let other waiting workers see the end too
+                return None
+            timeout = max(0.0, self.ready[0][0] - time.monotonic()) if self.ready else None
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def task_done(self) -> None:
+        """Mark a URL from get() as processed (its links, if any, already added)."""
+        self.pending -= 1
+        self._wake()
+
+    def __len__(self) -> int:
+        return self.in_memory + self.spilled
+
+# Local stand-in server, so the crawler can be exercised without the internet
+
+@contextlib.asynccontextmanager
+async def local_test_server(page_size: int = 2_000, latency: float = 0.005,
+                            fail_every: int = 0, n_pages: int = 0,
+                            links_per_page: int = 0, fail_status: int = 503) -> AsyncIterator[str]:
+    """Serve /page/<n> on 127.0.0.1; yields the base URL.
+
+    Every fail_every-th request (if non-zero) gets fail_status (503 by
+    default, or e.g. 429) with Retry-After: 0, to exercise retries.
+    With n_pages, page n links to page n + 1 and to links_per_page - 1 other
+    pseudo-random pages, so a crawl from /page/0 reaches all n_pages.
+    """
+    hits = 0
+    body = "x" * page_size
+
+    async def page(request: web.Request) -> web.Response:
+        nonlocal hits
+        hits += 1
+        fail = fail_every and hits % fail_every == 0
+        await asyncio.sleep(latency)
+        if fail:
+            return web.Response(status=fail_status, headers={"Retry-After": "0"})
+        n = request.match_info["n"]
+        links = ""
+        if n_pages and int(n) + 1 < n_pages:
+            rng = random.Random(n)
+            targets = [int(n) + 1] + [rng.randrange(n_pages) for _ in range(links_per_page - 1)]
+            links = "".join(f'<a href="/page/{m}#top">{m}</a>' for m in targets)
+        return web.Response(text=f"<html><title>page {n}</title><body>{links}{body}</body></html>",
+                            content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/page/{n}", page)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        await runner.cleanup()
+
+async def benchmark_crawler(n_urls: int = 2_000) -> None:
+    """Unbounded gather vs the Crawler engine against the local server."""
+    async with local_test_server(fail_every=50) as base:
+        urls = [f"{base}/page/{i}" for i in range(n_urls)]
+
+        start = time.perf_counter()
+        async with aiohttp.ClientSession() as session:
+            async def get(url):
+                async with session.get(url) as resp:
+                    return resp.status
+            statuses = await asyncio.gather(*(get(url) for url in urls))
+        print(f"gather (unbounded)   {time.perf_counter() - start:6.2f}s  "
+              f"ok={sum(s == 200 for s in statuses)}/{n_urls}")
+
+        for concurrency in (10, 50):
+            start = time.perf_counter()
+            ok = attempts = 0
+            async for result in Crawler(concurrency=concurrency, limit_per_host=concurrency,
+                                        backoff=0.01).crawl(urls):
+                ok += result.ok
+                attempts += result.attempts
+            print(f"Crawler({concurrency:>3} workers) {time.perf_counter() - start:6.2f}s  "
+                  f"ok={ok}/{n_urls} attempts={attempts}")
+
+        start = time.perf_counter()
+        async for _ in Crawler(concurrency=10, rate=200).crawl(urls[:400]):
+            pass
+        print(f"Crawler(rate=200/s)  {time.perf_counter() - start:6.2f}s  for 400 urls")
 
 # Multi-thread version with requests
-def fetch_sync(url):
-    resp = requests.get(url)
-    print_title(url)
-    return resp.text
+def fetch_sync(url, max_bytes=None, sink=None, chunk_size=CHUNK_SIZE):
+    """Sync counterpart of fetch: chunked reads, max_bytes limit, optional sink.
+
+    Returns the text, or the body size in bytes when streaming to sink.
+    """
+    with requests.get(url, stream=True, timeout=(10, 30)) as resp:
+        length = int(resp.headers.get("Content-Length") or 0)
+        if max_bytes is not None and length > max_bytes:
+            raise ResponseTooLarge(f"{url}: Content-Length {length} > {max_bytes}")
+        body, size = bytearray(), 0
+        for chunk in resp.iter_content(chunk_size):
+            size += len(chunk)
+            if max_bytes is not None and size > max_bytes:
+                raise ResponseTooLarge(f"{url}: body exceeds {max_bytes} bytes")
+            if sink is None:
+                body += chunk
+            else:
+                sink(url, chunk)
+        print_title(url)
+        if sink is not None:
+            return size
+        return body.decode(resp.encoding or "utf-8", errors="replace")
 
-def threaded_crawler():
+def threaded_crawler(urls=URLS, max_bytes=None, sink=None):
+    """Bodies (or sizes, when streaming to sink) in url order."""
     with ThreadPoolExecutor(max_workers=10) as executor:
-        return list(executor.map(fetch_sync, URLS))
+        return list(executor.map(lambda url: fetch_sync(url, max_bytes, sink), urls))
+
+async def benchmark_frontier(n_pages: int = 5_000, n_seen: int = 1_000_000) -> None:
+    """Frontier crawl of a linked local site, plus seen-set memory: set vs Bloom."""
+    async with local_test_server(latency=0.002, n_pages=n_pages, links_per_page=5) as base:
+        with tempfile.TemporaryDirectory() as spill_dir:
+            for label, frontier in (("in memory", Frontier(delay=0, capacity=n_pages * 2)),
+                                    ("spill >500", Frontier(delay=0, capacity=n_pages * 2,
+                                                            max_in_memory=500, spill_dir=spill_dir))):
+                frontier.add(f"{base}/page/0")
+                start = time.perf_counter()
+                ok = 0
+                async for result in Crawler(concurrency=50, limit_per_host=50).crawl_frontier(frontier):
+                    ok += result.ok
+                elapsed = time.perf_counter() - start
+                print(f"frontier ({label:<10}) {ok}/{n_pages} pages in {elapsed:5.2f}s  "
+                      f"({ok / elapsed:,.0f} pages/s)")
+
+        # Politeness: one host, 20ms between hand-outs, regardless of workers.
+        frontier = Frontier(delay=0.02)
+        for i in range(50):
+            frontier.add(f"{base}/page/{i}")
+        start = time.perf_counter()
+        async for _ in Crawler(concurrency=20).crawl_frontier(frontier, follow=False):
+            pass
+        print(f"politeness delay=20ms: 50 pages in {time.perf_counter() - start:5.2f}s")
+
+    urls = [f"https://host{i % 1000}.example/page/{i}" for i in range(n_seen)]
+    for label, make in (("set of str", set), ("BloomFilter", lambda: BloomFilter(n_seen))):
+        tracemalloc.start()
+        seen = make()
+        for url in urls:
+            seen.add(url)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"seen-set {label:<12} {n_seen:,} urls  {peak / 2**20:7.1f} MiB (excluding the url strings)")
+
+async def benchmark_streaming(n_pages: int = 100, page_size: int = 1_000_000) -> None:
+    """Peak traced memory: buffering every body vs streaming chunks to a sink."""
+    async with local_test_server(page_size=page_size, latency=0) as base:
+        urls = [f"{base}/page/{i}" for i in range(n_pages)]
+        received = 0
+
+        def count(url, chunk):
+            nonlocal received
+            received += len(chunk)
+
+        async def buffered():
+            return [r async for r in Crawler(concurrency=10).crawl(urls)]
+
+        async def streamed():
+            return [r async for r in Crawler(concurrency=10, sink=count).crawl(urls)]
+
+        async def limited():
+            return [r async for r in Crawler(concurrency=10, max_bytes=page_size // 2).crawl(urls)]
+
+        for label, run in (("buffered", buffered), ("sink", streamed), ("max_bytes", limited)):
+            tracemalloc.start()
+            start = time.perf_counter()
+            results = await run()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            ok = sum(r.ok for r in results)
+            print(f"{label:<9} {ok}/{n_pages} ok  {sum(r.size for r in results) / 2**20:7.1f} MiB read  "
+                  f"peak {peak / 2**20:7.1f} MiB  {elapsed:5.2f}s")
+            del results
 
 if __name__ == "__main__":
+    print("--- Crawler engine vs local server ---")
+    asyncio.run(benchmark_crawler())
+    print("--- Frontier crawl vs local server ---")
+    asyncio.run(benchmark_frontier())
+    print("--- Buffered vs streamed bodies ---")
+    asyncio.run(benchmark_streaming())
+    if "--live" not in sys.argv:
+        sys.exit(0)
+
     print("--- Asyncio version ---")
     start = time.time()
     asyncio.run(async_crawler())
@@ -0,0 +1,119 @@
+"""
+Unit tests for the async crawler engine, run against the local stand-in server.
+"""
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+from crawler_async import Crawler, local_test_server
+
+
+async def collect(crawler, urls):
+    # Bounded so a regression that hangs the crawl fails instead of stalling the suite.
+    async def run():
+        return [result async for result in crawler.crawl(urls)]
+
+    return await asyncio.wait_for(run(), timeout=20)
+
+
+class TestCrawler:
+    """Retries, size limits, streaming and failure handling."""
+
+    @pytest.mark.parametrize("status", [429, 503])
+    def test_retryable_statuses_are_retried(self, status):
+        async def main():
+            async with local_test_server(fail_every=2, fail_status=status, latency=0) as base:
+                urls = [f"{base}/page/{i}" for i in range(10)]
+                return await collect(Crawler(concurrency=1, backoff=0), urls)
+
+        results = asyncio.run(main())
+        assert all(result.ok and result.status == 200 for result in results)
+        assert sorted(result.attempts for result in results) == [1] + [2] * 9
+
+    def test_last_status_is_reported_when_retries_run_out(self):
+        async def main():
+            async with local_test_server(fail_every=1, fail_status=429, latency=0) as base:
+                return await collect(Crawler(retries=2, backoff=0), [f"{base}/page/0"])
+
+        [result] = asyncio.run(main())
+        assert (result.ok, result.status, result.attempts) == (False, 429, 3)
+
+    def test_max_bytes_fails_oversized_bodies(self):
+        async def main():
+            async with local_test_server(page_size=50_000, latency=0) as base:
+                return await collect(Crawler(max_bytes=10_000), [f"{base}/page/0"])
+
+        [result] = asyncio.run(main())
+        assert not result.ok and result.body is None
+        assert result.error.startswith("ResponseTooLarge")
+
+    @pytest.mark.parametrize("use_async_sink", [False, True])
+    def test_sink_receives_every_chunk(self, use_async_sink):
+        received = {}
+
+        def sink(url, chunk):
+            received[url] = received.get(url, b"") + chunk
+
+        async def async_sink(url, chunk):
+            await asyncio.sleep(0)
+            sink(url, chunk)
+
+        async def main():
+            async with local_test_server(page_size=300_000, latency=0) as base:
+                urls = [f"{base}/page/{i}" for i in range(5)]
+                crawler = Crawler(chunk_size=4096, sink=async_sink if use_async_sink else sink)
+                return await collect(crawler, urls)
+
+        results = asyncio.run(main())
+        assert all(result.ok and result.body is None for result in results)
+        assert {result.url: result.size for result in results} == {url: len(body) for url, body in received.items()}
+        assert all(body.endswith(b"</body></html>") for body in received.values())
+
+    def test_error_in_url_iterable_is_raised(self):
+        def urls(base):
+            yield f"{base}/page/0"
+            yield f"{base}/page/1"
+            raise RuntimeError("url source failed")
+
+        async def main():
+            async with local_test_server(latency=0) as base:
+                await collect(Crawler(concurrency=4), urls(base))
+
+        with pytest.raises(RuntimeError, match="url source failed"):
+            asyncio.run(main())
+
+    def test_backoff_does_not_hold_a_connection(self):
+        """While one URL waits out Retry-After, another URL to the same host gets the only slot."""
+        hits = {"slow": 0}
+
+        async def slow(request):
+            hits["slow"] += 1
+            if hits["slow"] == 1:
+                # Too big to be buffered whole, so an unread response keeps its connection.
+                return web.Response(status=429, body=b"x" * (8 << 20), headers={"Retry-After": "1"})
+            return web.Response(text="slow")
+
+        async def fast(request):
+            return web.Response(text="fast")
+
+        async def main():
+            app = web.Application()
+            app.router.add_get("/slow", slow)
+            app.router.add_get("/fast", fast)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+            try:
+                start = time.perf_counter()
+                arrivals = {}
+                async for result in Crawler(concurrency=2, limit_per_host=1).crawl([f"{base}/slow", f"{base}/fast"]):
+                    arrivals[result.body] = time.perf_counter() - start
+                return arrivals
+            finally:
+                await runner.cleanup()
+
+        arrivals = asyncio.run(main())
+        assert arrivals["fast"] < 0.5 <= arrivals["slow"]